@@ -11,7 +11,7 @@ from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlmodel import Session, select
 from config.database import get_session
-from models.user_context import User  # Assuming User model exists from Phase II
+from src.models.todo_model import User  # Phase II User model
 
 # Initialize security scheme for API documentation
 security = HTTPBearer()
@@ -4,8 +4,9 @@ import os
 from typing import Generator
 from sqlmodel import SQLModel
 
-# Force SQLite for local development to avoid connection issues
-DATABASE_URL = "sqlite:///./todo_backend.db"
+# Default to SQLite for local development to avoid connection issues; the
+# env var lets tests (e.g. pytest-xdist workers) point at their own database.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./todo_backend.db")
 
 # Create the engine with connection pooling settings
 pool_size = int(os.getenv("DB_POOL_SIZE", "5"))
@@ -16,10 +17,17 @@ pool_recycle = int(os.getenv("DB_POOL_RECYCLE", "3600"))
 # Configure engine appropriately for SQLite vs PostgreSQL
 if DATABASE_URL.startswith("sqlite"):
     # SQLite-specific configuration to avoid connection issues
+    engine_kwargs = {}
+    if DATABASE_URL in ("sqlite://", "sqlite:///:memory:"):
+        # An in-memory database exists per connection; StaticPool keeps one
+        # shared connection alive so every session sees the same schema.
+        from sqlalchemy.pool import StaticPool
+        engine_kwargs["poolclass"] = StaticPool
     engine: Engine = create_engine(
         DATABASE_URL,
         echo=(os.getenv("LOG_LEVEL", "INFO").upper() == "DEBUG"),
-        connect_args={"check_same_thread": False}  # Required for SQLite with FastAPI
+        connect_args={"check_same_thread": False},  # Required for SQLite with FastAPI
+        **engine_kwargs
     )
 else:
     # PostgreSQL configuration
@@ -37,6 +37,14 @@ class UserNotFoundException(ChatException):
         super().__init__(detail=detail, status_code=status.HTTP_404_NOT_FOUND)
 
 
+class ValidationError(ChatException):
+    """
+    Raised when request input fails validation (empty message, bad IDs, etc.).
+    """
+    def __init__(self, detail: str = "Invalid input"):
+        super().__init__(detail=detail, status_code=status.HTTP_400_BAD_REQUEST)
+
+
 class InvalidMessageContentException(ChatException):
     """
     Raised when message content is invalid.
@@ -7,6 +7,7 @@ from typing import Dict, Any, Optional, List
 from fastapi import HTTPException, status
 from sqlmodel import Session
 from backend.services.task_service import TaskService
+from backend.models.task import Task
 from backend.validation.base_validator import TaskValidator
 from backend.utils.response_utils import create_success_response, create_error_response
 from backend.utils.error_utils import handle_error, ValidationError, NotFoundError
@@ -4,6 +4,7 @@ Represents a message within an agent conversation session.
 """
 
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import CheckConstraint, Column, JSON
 from datetime import datetime
 import uuid
 from typing import TYPE_CHECKING, Optional, Dict, Any
@@ -22,20 +23,20 @@ class AgentMessage(SQLModel, table=True):
     __tablename__ = "agent_messages"
 
     # Primary key
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)  # String IDs, matching TodoTask's convention
 
     # Foreign keys
-    session_id: uuid.UUID = Field(foreign_key="agent_sessions.id", nullable=False)  # Link to conversation session
-    user_id: uuid.UUID = Field(foreign_key="users.id", nullable=False)  # Who sent this message
+    session_id: str = Field(foreign_key="agent_sessions.id", nullable=False)  # Link to conversation session
+    user_id: str = Field(nullable=False, index=True)  # Who sent this message (no users table; auth is JWT-only)
 
     # Message content and metadata
-    role: str = Field(sa_column_kwargs={"check": "role IN ('user', 'assistant', 'tool')"})  # Who sent the message
+    role: str = Field(sa_column_args=[CheckConstraint("role IN ('user', 'assistant', 'tool')")])  # Who sent the message
     content: str = Field(max_length=10000)  # The actual message content
     timestamp: datetime = Field(default_factory=datetime.utcnow)  # When the message was created
 
     # Tool execution information (when role is 'tool')
-    tool_calls: Optional[Dict[str, Any]] = Field(default=None, sa_column='JSON')  # Details of tools called by agent
-    tool_call_results: Optional[Dict[str, Any]] = Field(default=None, sa_column='JSON')  # Results from tool executions
+    tool_calls: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))  # Details of tools called by agent
+    tool_call_results: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))  # Results from tool executions
 
     # Relationships
     session: "AgentSession" = Relationship(back_populates="messages")
@@ -108,7 +109,7 @@ class AgentMessage(SQLModel, table=True):
         return self.role == "tool"
 
     @classmethod
-    def create_user_message(cls, session_id: uuid.UUID, user_id: uuid.UUID, content: str) -> "AgentMessage":
+    def create_user_message(cls, session_id: str, user_id: str, content: str) -> "AgentMessage":
         """
         Create a new user message.
 
@@ -128,7 +129,7 @@ class AgentMessage(SQLModel, table=True):
         )
 
     @classmethod
-    def create_assistant_message(cls, session_id: uuid.UUID, user_id: uuid.UUID, content: str) -> "AgentMessage":
+    def create_assistant_message(cls, session_id: str, user_id: str, content: str) -> "AgentMessage":
         """
         Create a new assistant message.
 
@@ -150,8 +151,8 @@ class AgentMessage(SQLModel, table=True):
     @classmethod
     def create_tool_message(
         cls,
-        session_id: uuid.UUID,
-        user_id: uuid.UUID,
+        session_id: str,
+        user_id: str,
         tool_calls: Optional[Dict[str, Any]] = None,
         tool_results: Optional[Dict[str, Any]] = None
     ) -> "AgentMessage":
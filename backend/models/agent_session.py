@@ -22,10 +22,10 @@ class AgentSession(SQLModel, table=True):
     __tablename__ = "agent_sessions"
 
     # Primary key
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)  # String IDs, matching TodoTask's convention
 
     # Foreign key to user (maintaining user isolation)
-    user_id: uuid.UUID = Field(foreign_key="users.id", nullable=False)
+    user_id: str = Field(nullable=False, index=True)  # No users table; auth is JWT-only
 
     # Session metadata
     title: Optional[str] = Field(default=None, max_length=200)  # Auto-generated or user-provided title
@@ -4,6 +4,7 @@ Represents tools available to the AI agent for performing operations.
 """
 
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import Column, JSON
 from datetime import datetime
 import uuid
 from typing import TYPE_CHECKING, Optional, Dict, Any
@@ -21,19 +22,19 @@ class AgentTool(SQLModel, table=True):
     __tablename__ = "agent_tools"
 
     # Primary key
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)  # String IDs, matching TodoTask's convention
 
     # Tool identification and metadata
-    name: str = Field(sa_column_kwargs={"unique": True, "nullable": False, "max_length": 100})  # Unique tool name
+    name: str = Field(unique=True, nullable=False, max_length=100)  # Unique tool name
     description: str = Field(max_length=500)  # Description of what the tool does
-    schema_def: Optional[Dict[str, Any]] = Field(default=None, sa_column='JSON')  # JSON schema definition for tool parameters
+    schema_def: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))  # JSON schema definition for tool parameters
     enabled: bool = Field(default=True)  # Whether the tool is currently available
     created_at: datetime = Field(default_factory=datetime.utcnow)
     updated_at: datetime = Field(default_factory=datetime.utcnow)
 
     # Relationship to user (who can access/use this tool - for user-specific tools)
     # Note: This could be null for system-wide tools
-    user_id: Optional[uuid.UUID] = Field(default=None, foreign_key="users.id")
+    user_id: Optional[str] = Field(default=None, index=True)
 
     def __repr__(self):
         """
@@ -0,0 +1,11 @@
+"""
+Task model alias for the AI assistant integration.
+
+The agent-side code and tests refer to the todo row as ``Task``; the table
+itself is defined by the Phase II ``TodoTask`` model. Re-export it under the
+agent-facing name so both layers persist to the same table.
+"""
+
+from backend.src.models.todo_model import TodoTask as Task
+
+__all__ = ["Task"]
@@ -4,6 +4,7 @@ Tracks all tool executions for monitoring, debugging, and security purposes.
 """
 
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import CheckConstraint, Column, JSON
 from datetime import datetime
 import uuid
 from typing import TYPE_CHECKING, Optional, Dict, Any
@@ -22,20 +23,20 @@ class ToolExecutionLog(SQLModel, table=True):
     __tablename__ = "tool_execution_logs"
 
     # Primary key
-    id: uuid.UUID = Field(default_factory=uuid.uuid4, primary_key=True)
+    id: str = Field(default_factory=lambda: str(uuid.uuid4()), primary_key=True)  # String IDs, matching TodoTask's convention
 
     # Foreign keys for tracking execution context
-    user_id: uuid.UUID = Field(foreign_key="users.id", nullable=False)  # User who initiated the tool call
-    session_id: Optional[uuid.UUID] = Field(default=None, foreign_key="agent_sessions.id")  # Session where tool was called
-    tool_id: uuid.UUID = Field(foreign_key="agent_tools.id", nullable=False)  # Tool that was executed
+    user_id: str = Field(nullable=False, index=True)  # User who initiated the tool call
+    session_id: Optional[str] = Field(default=None, foreign_key="agent_sessions.id")  # Session where tool was called
+    tool_id: str = Field(foreign_key="agent_tools.id", nullable=False)  # Tool that was executed
 
     # Execution details
     tool_name: str = Field(max_length=100, nullable=False)  # Name of the tool (denormalized for performance)
-    parameters: Optional[Dict[str, Any]] = Field(default=None, sa_column='JSON')  # Input parameters passed to the tool
-    result: Optional[Dict[str, Any]] = Field(default=None, sa_column='JSON')  # Output from the tool execution
+    parameters: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))  # Input parameters passed to the tool
+    result: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))  # Output from the tool execution
     error_message: Optional[str] = Field(default=None, max_length=1000)  # Error message if execution failed
     execution_time_ms: Optional[float] = Field(default=None)  # Time taken to execute the tool in milliseconds
-    status: str = Field(sa_column_kwargs={"check": "status IN ('success', 'error', 'cancelled')"})  # Execution status
+    status: str = Field(sa_column_args=[CheckConstraint("status IN ('success', 'error', 'cancelled')")])  # Execution status
 
     # Timestamps
     executed_at: datetime = Field(default_factory=datetime.utcnow)
@@ -76,14 +77,14 @@ class ToolExecutionLog(SQLModel, table=True):
     @classmethod
     def create_log(
         cls,
-        user_id: uuid.UUID,
-        tool_id: uuid.UUID,
+        user_id: str,
+        tool_id: str,
         tool_name: str,
         parameters: Optional[Dict[str, Any]] = None,
         result: Optional[Dict[str, Any]] = None,
         error_message: Optional[str] = None,
         execution_time_ms: Optional[float] = None,
-        session_id: Optional[uuid.UUID] = None
+        session_id: Optional[str] = None
     ) -> "ToolExecutionLog":
         """
         Create a tool execution log entry.
@@ -4,6 +4,7 @@ Stores user-specific information and preferences for AI interactions.
 """
 
 from sqlmodel import SQLModel, Field, Relationship
+from sqlalchemy import CheckConstraint, Column, JSON
 from datetime import datetime
 import uuid
 from typing import TYPE_CHECKING, Optional, Dict, Any
@@ -21,7 +22,7 @@ class UserContext(SQLModel, table=True):
     __tablename__ = "user_contexts"
 
     # Primary key - using user_id as primary key since each user has exactly one context
-    user_id: uuid.UUID = Field(foreign_key="users.id", primary_key=True)
+    user_id: str = Field(primary_key=True)  # String IDs, matching TodoTask's convention
 
     # Personalization information
     preferred_name: Optional[str] = Field(default=None, max_length=100)  # Preferred name for addressing the user
@@ -31,13 +32,13 @@ class UserContext(SQLModel, table=True):
 
     # AI interaction preferences
     preferred_temperature: float = Field(default=0.7)  # Temperature setting for AI responses (0.0 to 1.0)
-    response_length_preference: str = Field(default="medium", sa_column_kwargs={"check": "response_length_preference IN ('short', 'medium', 'long')"})  # Preferred response length
+    response_length_preference: str = Field(default="medium", sa_column_args=[CheckConstraint("response_length_preference IN ('short', 'medium', 'long')")])  # Preferred response length
     ai_personality_preference: Optional[str] = Field(default=None, max_length=100)  # Personality traits the user prefers
 
     # Context information
     user_profile_summary: Optional[str] = Field(default=None, max_length=500)  # Summary of user's work/interests
-    frequent_topics: Optional[list[str]] = Field(default=[], sa_column='JSON')  # Topics the user frequently asks about
-    context_notes: Optional[Dict[str, Any]] = Field(default=None, sa_column='JSON')  # Additional context notes for AI
+    frequent_topics: Optional[list[str]] = Field(default=[], sa_column=Column(JSON))  # Topics the user frequently asks about
+    context_notes: Optional[Dict[str, Any]] = Field(default=None, sa_column=Column(JSON))  # Additional context notes for AI
 
     # Usage statistics
     total_interactions: int = Field(default=0)  # Total number of AI interactions
@@ -80,7 +81,7 @@ class UserContext(SQLModel, table=True):
         return d
 
     @classmethod
-    def create_default_context(cls, user_id: uuid.UUID) -> "UserContext":
+    def create_default_context(cls, user_id: str) -> "UserContext":
         """
         Create a default user context for a new user.
 
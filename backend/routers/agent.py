@@ -3,29 +3,119 @@ Agent API router for the AI assistant integration.
 This module defines the API endpoints for agent functionality.
 """
 
-from typing import Dict, Any, List;
-from fastapi import APIRouter, Depends, HTTPException, status;
+from typing import Dict, Any, List, Optional;
+from fastapi import APIRouter, Depends, HTTPException, Request, status;
 from sqlmodel import Session, select;
 from datetime import datetime;
 import uuid;
 
 from config.database import get_session
 from src.auth.auth_dependencies import get_user_from_token
-from ..services.openai_agent_service import OpenAIAgentService
-from ..services.todo_tools import TodoTools
-from ..models.agent_session import AgentSession
-from ..models.agent_message import AgentMessage
-from ..config.agent_config import AgentConfig
+from backend.services.openai_agent_service import OpenAIAgentService
+from backend.services.todo_tools import TodoTools
+from backend.models.agent_session import AgentSession
+from backend.models.agent_message import AgentMessage
+from backend.config.agent_config import AgentConfig
 import os
 
 router = APIRouter(prefix="/api/{user_id}", tags=["agent"])
 
+
+def build_agent_service(session: Session) -> OpenAIAgentService:
+    """
+    Construct an OpenAI agent service around ``session``.
+
+    The session comes from the caller — normally the request-scoped one from
+    get_session — so its lifecycle (close, rollback on failure) follows the
+    request instead of a single Session living for the whole process.
+    """
+    use_stub = os.getenv("USE_STUB_AGENT", "false").lower() == "true"
+    return OpenAIAgentService(session, use_stub=use_stub)
+
+
+def get_agent_service(
+    request: Request,
+    session: Session = Depends(get_session)
+) -> OpenAIAgentService:
+    """
+    Return the agent service for this request.
+
+    Tests can assign app.state.agent_service to share one pre-wired instance;
+    otherwise the service is built around the request-scoped session so its
+    database work joins the request's transaction and the session is released
+    when the request ends.
+    """
+    service = getattr(request.app.state, "agent_service", None)
+    if service is not None:
+        return service
+    return build_agent_service(session)
+
+
+def _stub_fallback_response(
+    agent_service: OpenAIAgentService,
+    user_id: str,
+    message_text: str,
+    conversation_id_str: Optional[str],
+    error: Exception
+) -> Dict[str, Any]:
+    """
+    Answer a chat message with the stub AI after an OpenAI failure.
+
+    Stores the user message and the fallback reply on the conversation and
+    returns a response body in the same shape as a successful chat turn.
+    Shared by /chat and /chat/batch so both endpoints degrade the same way.
+    """
+    from backend.ai.stub_ai import get_ai_response
+
+    context = {
+        "conversation_id": conversation_id_str,
+        "user_id": user_id,
+        "error": str(error)
+    }
+
+    ai_response = get_ai_response(message_text, context)
+
+    # Create or use existing session
+    if conversation_id_str:
+        try:
+            conversation_id = uuid.UUID(conversation_id_str)
+        except ValueError:
+            conversation_id = uuid.uuid4()
+    else:
+        conversation_id = uuid.uuid4()
+
+    # Store messages using fallback
+    agent_service.add_message_to_session(
+        session_id=str(conversation_id),
+        user_id=user_id,
+        role="user",
+        content=message_text
+    )
+
+    ai_message = agent_service.add_message_to_session(
+        session_id=str(conversation_id),
+        user_id=user_id,
+        role="assistant",
+        content=f"[Fallback AI: {str(error)}] {ai_response}"
+    )
+
+    return {
+        "conversation_id": str(conversation_id),
+        "response": ai_response,
+        "timestamp": datetime.utcnow().isoformat(),
+        "message_id": str(ai_message.id),
+        "conversation_title": f"Chat: {message_text[:50]}..." if len(message_text) > 50 else f"Chat: {message_text}",
+        "using_stub": True,
+        "error": str(error)
+    }
+
+
 @router.post("/chat", response_model=Dict[str, Any])
 async def agent_chat(
     user_id: str,
     message_request: Dict[str, Any],
-    session: Session = Depends(get_session),
-    current_user_id: str = Depends(get_user_from_token)
+    current_user_id: str = Depends(get_user_from_token),
+    openai_agent_service: OpenAIAgentService = Depends(get_agent_service)
 ):
     """
     Handle chat interactions between user and AI agent.
@@ -36,7 +126,6 @@ async def agent_chat(
     Args:
         user_id: ID of the authenticated user (from URL path)
         message_request: Request body containing message content and optional conversation ID
-        session: Database session
         current_user_id: ID of the authenticated user (from token)
 
     Returns:
@@ -71,12 +160,6 @@ async def agent_chat(
                 detail="Message content is required and cannot be empty"
             )
 
-        # Check if we should use stub AI
-        use_stub = os.getenv("USE_STUB_AGENT", "false").lower() == "true"
-
-        # Initialize OpenAI agent service
-        openai_agent_service = OpenAIAgentService(session, use_stub=use_stub)
-
         # Process the message using OpenAI Agent service
         try:
             result = openai_agent_service.process_message(
@@ -104,50 +187,104 @@ async def agent_chat(
 
         except Exception as e:
             # If OpenAI fails, fall back to stub AI
-            from backend.ai.stub_ai import get_ai_response
+            return _stub_fallback_response(
+                openai_agent_service, user_id, message_text,
+                conversation_id_str, e
+            )
 
-            context = {
-                "conversation_id": conversation_id_str,
-                "user_id": user_id,
-                "error": str(e)
-            }
+    except HTTPException:
+        # Re-raise HTTP exceptions
+        raise
+    except Exception as e:
+        # Handle unexpected errors
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"An unexpected error occurred: {str(e)}"
+        )
 
-            ai_response = get_ai_response(message_text, context)
-
-            # Create or use existing session
-            if conversation_id_str:
-                try:
-                    conversation_id = uuid.UUID(conversation_id_str)
-                except ValueError:
-                    conversation_id = uuid.uuid4()
-            else:
-                conversation_id = uuid.uuid4()
-
-            # Store messages using fallback
-            agent_service = openai_agent_service
-            user_message = agent_service.add_message_to_session(
-                session_id=str(conversation_id),
-                user_id=user_id,
-                role="user",
-                content=message_text
-            )
 
-            ai_message = agent_service.add_message_to_session(
-                session_id=str(conversation_id),
-                user_id=user_id,
-                role="assistant",
-                content=f"[Fallback AI: {str(e)}] {ai_response}"
+@router.post("/chat/batch", response_model=List[Dict[str, Any]])
+async def agent_chat_batch(
+    user_id: str,
+    message_requests: List[Dict[str, Any]],
+    current_user_id: str = Depends(get_user_from_token),
+    openai_agent_service: OpenAIAgentService = Depends(get_agent_service)
+):
+    """
+    Process several chat messages in a single round-trip.
+
+    Accepts a JSON array of message bodies (same shape as /chat) and returns
+    the agent responses in order. Amortizes HTTP, routing, and auth overhead
+    when a caller has multiple independent messages to send.
+
+    Args:
+        user_id: ID of the authenticated user (from URL path)
+        message_requests: List of request bodies with message content and
+            optional conversation ID
+        current_user_id: ID of the authenticated user (from token)
+
+    Returns:
+        List of response dicts, one per input message, in input order
+    """
+    # Verify that the user_id in the URL matches the authenticated user
+    if user_id != current_user_id:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Access denied: Cannot access another user's agent session"
+        )
+
+    try:
+        # Validate user_id format
+        try:
+            uuid.UUID(user_id)
+        except ValueError:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Invalid user ID format"
             )
 
-            return {
-                "conversation_id": str(conversation_id),
-                "response": ai_response,
-                "timestamp": datetime.utcnow().isoformat(),
-                "message_id": str(ai_message.id),
-                "conversation_title": f"Chat: {message_text[:50]}..." if len(message_text) > 50 else f"Chat: {message_text}",
-                "using_stub": True,
-                "error": str(e)
-            }
+        # Validate the full array before processing anything, so a bad
+        # entry rejects the batch instead of leaving earlier messages
+        # half-applied
+        for index, message_request in enumerate(message_requests):
+            message_text = message_request.get("message")
+            if not message_text or len(message_text.strip()) == 0:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail=f"Message content is required and cannot be empty (entry {index})"
+                )
+
+        responses = []
+        for message_request in message_requests:
+            message_text = message_request["message"]
+            conversation_id_str = message_request.get("conversation_id")
+
+            try:
+                result = openai_agent_service.process_message(
+                    user_id=user_id,
+                    message=message_text,
+                    session_id=conversation_id_str
+                )
+
+                responses.append({
+                    "conversation_id": result.get("session_id"),
+                    "response": result.get("response"),
+                    "timestamp": result.get("timestamp"),
+                    "message_id": result.get("message_id"),
+                    "tool_calls": result.get("tool_calls"),
+                    "tool_results": result.get("tool_results"),
+                    "using_stub": result.get("using_stub", False)
+                })
+
+            except Exception as e:
+                # If OpenAI fails, fall back to stub AI — same degradation
+                # as the single-message endpoint
+                responses.append(_stub_fallback_response(
+                    openai_agent_service, user_id, message_text,
+                    conversation_id_str, e
+                ))
+
+        return responses
 
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -163,8 +300,9 @@ async def agent_chat(
 @router.get("/conversations", response_model=List[Dict[str, Any]])
 async def get_agent_conversations(
     user_id: str,
-    session: Session = Depends(get_user_from_token),
-    current_user_id: str = Depends(get_user_from_token)
+    session: Session = Depends(get_session),
+    current_user_id: str = Depends(get_user_from_token),
+    openai_agent_service: OpenAIAgentService = Depends(get_agent_service)
 ):
     """
     Retrieve all agent conversations for the specified usered by most recent activity.
@@ -194,10 +332,6 @@ async def get_agent_conversations(
                 detail="Invalid user ID format"
             )
 
-        # Initialize OpenAI agent service
-        use_stub = os.getenv("USE_STUB_AGENT", "false").lower() == "true"
-        openai_agent_service = OpenAIAgentService(session, use_stub=use_stub)
-
         # Get user's conversations
         conversations = openai_agent_service.get_user_conversations(user_uuid)
 
@@ -232,8 +366,9 @@ async def get_agent_conversations(
 async def get_agent_conversation(
     user_id: str,
     conversation_id: str,
-    session: Session = Depends(get_user_from_token),
-    current_user_id: str = Depends(get_user_from_token)
+    session: Session = Depends(get_session),
+    current_user_id: str = Depends(get_user_from_token),
+    openai_agent_service: OpenAIAgentService = Depends(get_agent_service)
 ):
     """
     Retrieve a specific on and its message history.
@@ -273,10 +408,6 @@ async def get_agent_conversation(
                 detail="Invalid conversation ID format"
             )
 
-        # Initialize OpenAI agent service
-        use_stub = os.getenv("USE_STUB_AGENT", "false").lower() == "true"
-        openai_agent_service = OpenAIAgentService(session, use_stub=use_stub)
-
         # Get the conversation
         conversation = openai_agent_service.get_agent_session(conv_uuid, user_uuid)
         if not conversation:
@@ -322,8 +453,9 @@ async def get_agent_conversation(
 async def delete_agent_conversation(
     user_id: str,
     conversation_id: str,
-    session: Session = Depends(get_user_from_token),
-    current_user_id: str = Depends(get_user_from_token)
+    session: Session = Depends(get_session),
+    current_user_id: str = Depends(get_user_from_token),
+    openai_agent_service: OpenAIAgentService = Depends(get_agent_service)
 ):
     """
     Delete a specific ation and all its messages.
@@ -363,10 +495,6 @@ async def delete_agent_conversation(
                 detail="Invalid conversation ID format"
             )
 
-        # Initialize OpenAI agent service
-        use_stub = os.getenv("USE_STUB_AGENT", "false").lower() == "true"
-        openai_agent_service = OpenAIAgentService(session, use_stub=use_stub)
-
         # Delete the conversation
         success = openai_agent_service.delete_conversation(conv_uuid, user_uuid)
 
@@ -67,9 +67,11 @@ class AgentService:
         Returns:
             AgentSession object if found and owned by user, None otherwise
         """
+        # Coerce to str so UUID objects from older callers still bind
+        # against the string ID columns
         statement = select(AgentSession).where(
-            AgentSession.id == session_id,
-            AgentSession.user_id == user_id
+            AgentSession.id == str(session_id),
+            AgentSession.user_id == str(user_id)
         )
         agent_session = self.session.exec(statement).first()
         return agent_session
@@ -87,7 +89,7 @@ class AgentService:
             List of AgentSession objects
         """
         statement = select(AgentSession).where(
-            AgentSession.user_id == user_id
+            AgentSession.user_id == str(user_id)
         ).order_by(AgentSession.updated_at.desc()).offset(offset).limit(limit)
 
         sessions = self.session.exec(statement).all()
@@ -116,6 +118,9 @@ class AgentService:
         Returns:
             Created AgentMessage object
         """
+        session_id = str(session_id)
+        user_id = str(user_id)
+
         # Verify user owns the session
         agent_session = self.get_agent_session(session_id, user_id)
         if not agent_session:
@@ -164,7 +169,7 @@ class AgentService:
             raise UnauthorizedAccessException(f"User {user_id} does not have access to session {session_id}")
 
         statement = select(AgentMessage).where(
-            AgentMessage.session_id == session_id
+            AgentMessage.session_id == str(session_id)
         ).order_by(AgentMessage.timestamp.asc()).offset(offset).limit(limit)
 
         messages = self.session.exec(statement).all()
@@ -16,7 +16,7 @@ from ..services.todo_tools import TodoTools
 from ..config.agent_config import AgentConfig
 # from ..models.agent_message import AgentMessage
 from ..models.agent_session import AgentSession
-from exceptions.chat_exceptions import UnauthorizedAccessException, ValidationError
+from backend.exceptions.chat_exceptions import UnauthorizedAccessException, ValidationError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -29,21 +29,25 @@ class OpenAIAgentService(AgentService):
     Extends the base AgentService with real AI capabilities.
     """
 
-    def __init__(self, session: Session, use_stub: bool = False):
+    def __init__(self, session: Session, use_stub: bool = False, openai_client=None):
         """
         Initialize the OpenAI agent service with a database session.
 
         Args:
             session: Database session for data access
             use_stub: Whether to fall back to stub AI (default: False)
+            openai_client: Optional pre-built OpenAI client; when given it is
+                used as-is, so tests can inject a fake without patching
         """
         super().__init__(session)
         self.session = session
         self.use_stub = use_stub
         self.todo_tools = TodoTools(session)
 
-        # Initialize OpenAI client only if not using stub
-        if not self.use_stub:
+        # Initialize OpenAI client only if not injected and not using stub
+        if openai_client is not None:
+            self.client = openai_client
+        elif not self.use_stub:
             api_key = AgentConfig.OPENAI_API_KEY
             if not api_key or api_key == "":
                 logger.warning("OPENAI_API_KEY not set. Falling back to stub AI.")
@@ -451,6 +455,16 @@ class OpenAIAgentService(AgentService):
 
         return conversation_history
 
+    def _create_chat_completion(self, **kwargs) -> Any:
+        """
+        Single seam for OpenAI chat-completion calls.
+
+        Both model calls in process_message go through here, so tests can
+        replace the model interaction at one point without touching the
+        OpenAI SDK's client structure.
+        """
+        return self.client.chat.completions.create(**kwargs)
+
     def process_message(
         self,
         user_id: str,
@@ -476,19 +490,20 @@ class OpenAIAgentService(AgentService):
             if len(message) > AgentConfig.MAX_MESSAGE_LENGTH:
                 raise ValidationError(f"Message exceeds maximum length of {AgentConfig.MAX_MESSAGE_LENGTH} characters")
 
-            # Convert user_id to UUID
+            # Validate user_id format; IDs stay strings end to end
             try:
-                user_uuid = uuid.UUID(user_id)
+                uuid.UUID(user_id)
             except ValueError:
                 raise ValidationError(f"Invalid user ID format: {user_id}")
 
             # Get or create session
             if session_id:
                 try:
-                    session_uuid = uuid.UUID(session_id)
-                    agent_session = self.get_agent_session(session_uuid, user_uuid)
+                    uuid.UUID(session_id)
+                    agent_session = self.get_agent_session(session_id, user_id)
                     if not agent_session:
                         raise ValidationError(f"Session {session_id} not found or access denied")
+                    session_uuid = session_id
                 except ValueError:
                     raise ValidationError(f"Invalid session ID format: {session_id}")
             else:
@@ -509,7 +524,7 @@ class OpenAIAgentService(AgentService):
                 return self._process_with_stub(user_id, message, session_uuid)
 
             # Build conversation history
-            conversation_history = self._build_conversation_history(session_uuid, user_uuid)
+            conversation_history = self._build_conversation_history(session_uuid, user_id)
 
             # Prepare messages for OpenAI
             messages = [
@@ -528,7 +543,7 @@ class OpenAIAgentService(AgentService):
             messages.append({"role": "user", "content": message})
 
             # Call OpenAI with function calling
-            response = self.client.chat.completions.create(
+            response = self._create_chat_completion(
                 model=AgentConfig.AGENT_MODEL_NAME,
                 messages=messages,
                 tools=self.tools,
@@ -593,7 +608,7 @@ class OpenAIAgentService(AgentService):
                     })
 
                 # Get the agent's final response after processing tool results
-                final_response = self.client.chat.completions.create(
+                final_response = self._create_chat_completion(
                     model=AgentConfig.AGENT_MODEL_NAME,
                     messages=messages,
                     temperature=AgentConfig.AGENT_TEMPERATURE,
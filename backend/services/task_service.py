@@ -3,10 +3,11 @@ TaskService class - Handles all task-related business logic (CRUD operations, st
 This service follows the single responsibility principle and provides clear task management functionality.
 """
 
+import uuid
 from typing import List, Optional, Dict, Any
 from datetime import datetime
 from sqlmodel import Session, select
-from backend.models.task import Task  # Assuming a Task model exists
+from backend.models.task import Task
 from backend.core.dependency_injection import register_service, Injectable
 from backend.utils.validator_utils import validate_required_fields
 from backend.utils.error_utils import ValidationError, NotFoundError, ServiceError
@@ -54,6 +55,7 @@ class TaskService(Injectable):
 
         # Create task instance
         task = Task(
+            id=str(uuid.uuid4()),  # TodoTask ids are app-generated strings
             user_id=user_id,
             title=title,
             description=description or "",
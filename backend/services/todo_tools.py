@@ -127,6 +127,7 @@ class TodoTools:
 
             # Create a new task
             task = Task(
+                id=str(uuid.uuid4()),  # TodoTask ids are app-generated strings
                 user_id=user_id,
                 title=sanitized_title.strip(),
                 description=sanitized_description.strip() if sanitized_description else None,
@@ -190,14 +191,14 @@ class TodoTools:
             sanitized_due_date = self._sanitize_input(due_date) if due_date is not None else None
             sanitized_priority = self._sanitize_input(priority) if priority is not None else None
 
-            # Convert todo_id to UUID if it's a string
+            # Validate todo_id format; ids are stored as strings
             try:
-                todo_uuid = uuid.UUID(todo_id)
+                uuid.UUID(todo_id)
             except ValueError:
                 raise ValidationError(f"Invalid todo ID: {todo_id}")
 
             # Get the existing task
-            statement = select(Task).where(Task.id == todo_uuid, Task.user_id == user_id)
+            statement = select(Task).where(Task.id == todo_id, Task.user_id == user_id)
             task = self.session.exec(statement).first()
 
             if not task:
@@ -333,7 +334,7 @@ class TodoTools:
         """
         try:
             # Validate user_id format
-            user_uuid = uuid.UUID(user_id)
+            uuid.UUID(user_id)
 
             # Comprehensive input validation
             if not user_id or not user_id.strip():
@@ -418,14 +419,14 @@ class TodoTools:
             True if user owns the todo, False otherwise
         """
         try:
-            # Convert todo_id to UUID if it's a string
+            # Validate todo_id format; ids are stored as strings
             try:
-                todo_uuid = uuid.UUID(todo_id)
+                uuid.UUID(todo_id)
             except ValueError:
                 raise ValidationError(f"Invalid todo ID: {todo_id}")
 
             # Check if the todo exists and belongs to the user
-            statement = select(Task).where(Task.id == todo_uuid, Task.user_id == user_id)
+            statement = select(Task).where(Task.id == todo_id, Task.user_id == user_id)
             task = self.session.exec(statement).first()
 
             return task is not None
@@ -452,14 +453,14 @@ class TodoTools:
             if not self._validate_user_ownership(todo_id, user_id):
                 raise UnauthorizedAccessException(f"Todo with ID {todo_id} not found or access denied")
 
-            # Convert todo_id to UUID if it's a string
+            # Validate todo_id format; ids are stored as strings
             try:
-                todo_uuid = uuid.UUID(todo_id)
+                uuid.UUID(todo_id)
             except ValueError:
                 raise ValidationError(f"Invalid todo ID: {todo_id}")
 
             # Get the existing task
-            statement = select(Task).where(Task.id == todo_uuid, Task.user_id == user_id)
+            statement = select(Task).where(Task.id == todo_id, Task.user_id == user_id)
             task = self.session.exec(statement).first()
 
             if not task:
@@ -517,7 +518,7 @@ class TodoTools:
                 raise ValidationError("Note content cannot exceed 5000 characters")
 
             # Get the existing task to verify ownership and existence
-            statement = select(Task).where(Task.id == uuid.UUID(todo_id), Task.user_id == user_id)
+            statement = select(Task).where(Task.id == todo_id, Task.user_id == user_id)
             task = self.session.exec(statement).first()
 
             if not task:
@@ -620,6 +621,7 @@ class TodoTools:
 
             # Create a new task with reminder characteristics
             task = Task(
+                id=str(uuid.uuid4()),  # TodoTask ids are app-generated strings
                 user_id=user_id,
                 title=sanitized_title.strip(),
                 description=sanitized_description.strip() if sanitized_description else None,
@@ -47,7 +47,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Create database tables on startup
+# Create database tables on startup. The agent service is built per
+# request around the request-scoped session (see routers.agent), unless a
+# test installs a shared instance on app.state.agent_service.
 @app.on_event("startup")
 async def on_startup():
     create_db_and_tables()
@@ -55,6 +57,7 @@ async def on_startup():
 # Include routers
 app.include_router(auth_router)  # Authentication endpoints
 app.include_router(todo_router)  # Todo endpoints
+app.include_router(agent_router)  # AI Agent endpoints
 
 @app.get("/")
 def read_root():
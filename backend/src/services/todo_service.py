@@ -1,3 +1,4 @@
+from sqlalchemy import insert
 from sqlmodel import Session, select
 from typing import List, Optional
 
@@ -83,6 +84,37 @@ def create_task(session: Session, todo_task: TodoTaskCreate, user_id: str) -> To
     return db_task
 
 
+def bulk_create_tasks(session: Session, user_id: str, rows: List[dict]) -> None:
+    """Insert many tasks for a user in one statement.
+
+    Seeding paths (test fixtures in particular) go through this instead of
+    one create_task — and one commit — per row; SQLAlchemy turns the row
+    list into a single executemany INSERT. Rows only need a title; the
+    other columns fall back to the same values create_task would use.
+    """
+    import uuid
+    current_time = datetime.now(timezone.utc)
+    session.execute(
+        insert(TodoTask),
+        [
+            {
+                "id": str(uuid.uuid4()),
+                "title": row["title"],
+                "description": row.get("description"),
+                "completed": row.get("completed", False),
+                "category": row.get("category"),
+                "priority": row.get("priority", "medium"),
+                "due_date": None,
+                "user_id": user_id,
+                "created_at": current_time,
+                "updated_at": current_time,
+            }
+            for row in rows
+        ],
+    )
+    session.commit()
+
+
 def get_tasks_by_user(session: Session, user_id: str) -> List[TodoTask]:
     """Get all tasks for a specific user"""
     statement = select(TodoTask).where(TodoTask.user_id == user_id)
@@ -0,0 +1,29 @@
+"""
+Lightweight test fakes shared across the backend test suite.
+"""
+
+from unittest.mock import MagicMock
+
+
+class FakeSession:
+    """Minimal stand-in for a sqlmodel Session in pure-mock tests.
+
+    MagicMock(spec=Session) walks the entire Session class (including
+    inherited SQLAlchemy methods) to build its spec and stubs every one of
+    them; the mocked tests only ever touch the handful of members below.
+    Each member is a plain MagicMock, so existing configuration like
+    ``session.exec.return_value = ...`` keeps working unchanged.
+    """
+
+    _MEMBERS = ("exec", "add", "commit", "refresh", "get", "delete")
+
+    def __init__(self):
+        for member in self._MEMBERS:
+            setattr(self, member, MagicMock())
+
+    def reset_mock(self, return_value=False, side_effect=False):
+        """Mirror MagicMock.reset_mock so fixtures can reset either kind."""
+        for member in self._MEMBERS:
+            getattr(self, member).reset_mock(
+                return_value=return_value, side_effect=side_effect
+            )
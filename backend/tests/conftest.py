@@ -1,33 +1,69 @@
-import pytest
-from sqlmodel import create_engine, SQLModel
-from sqlalchemy.pool import StaticPool
-from fastapi.testclient import TestClient
+import os
+import sys
+import types
+
+# Stub the OpenAI SDK before the app import below pulls it in. Every test
+# drives the agent through an injected fake client or the
+# _create_chat_completion seam, so nothing in the suite needs the real
+# (heavyweight) package; resolving `from openai import OpenAI` against this
+# stub keeps its import cost out of collection. Pre-importing the real
+# package before pytest starts bypasses the stub if it is ever needed.
+if "openai" not in sys.modules:
+    _openai_stub = types.ModuleType("openai")
+
+    class _OpenAIError(Exception):
+        pass
+
+    class _StubOpenAI:
+        """Construction succeeds (the service builds a client when an API
+        key is set), but any actual completion call fails loudly so a test
+        that forgot to inject a fake client surfaces immediately."""
 
-# Import the app and modules (now available as installed package)
-from todo_backend.src.main import app
-from todo_backend.src.config.database import get_session
-from todo_backend.src.models.todo_model import TodoTask, TodoTaskCreate
-from sqlmodel import Session
+        def __init__(self, *args, **kwargs):
+            pass
 
+        def __getattr__(self, name):
+            raise RuntimeError(
+                "The openai package is stubbed out in tests; "
+                "inject a fake client instead of calling the SDK"
+            )
 
-@pytest.fixture(name="session")
-def session_fixture():
-    engine = create_engine(
-        "sqlite:///:memory:",
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
+    _openai_stub.OpenAI = _StubOpenAI
+    _openai_stub.OpenAIError = _OpenAIError
+    _openai_stub.APITimeoutError = type("APITimeoutError", (_OpenAIError,), {})
+    _openai_stub.APIConnectionError = type(
+        "APIConnectionError", (_OpenAIError,), {}
     )
-    SQLModel.metadata.create_all(bind=engine)
-    with Session(engine) as session:
-        yield session
+    sys.modules["openai"] = _openai_stub
+
+# Run the suite against an in-memory database: the tests do tiny
+# transactional CRUD, and the file-backed default pays a disk sync on every
+# commit. In-memory SQLite is also private to each process, which keeps the
+# pytest-xdist workers (-n auto in pytest.ini) isolated without per-worker
+# files. Must run before the app import below, which creates the engine
+# (with StaticPool for in-memory URLs, see config/database.py).
+os.environ.setdefault("DATABASE_URL", "sqlite://")
+
+import pytest
+from fastapi.testclient import TestClient
+
+from backend.src.main import app
 
 
-@pytest.fixture(name="client")
-def client_fixture():
-    def get_session_override():
-        yield session_fixture()
+@pytest.fixture(scope="session")
+def client():
+    """Session-scoped test client shared across the suite.
 
-    app.dependency_overrides[get_session] = get_session_override
-    client = TestClient(app)
-    yield client
-    app.dependency_overrides.clear()
\ No newline at end of file
+    Building TestClient(app) per test re-runs the ASGI lifespan (including
+    table creation at startup) and rebuilds the transport every time; one
+    client amortizes that over the whole run. Modules that need a different
+    transport (e.g. an async client) override this fixture locally, and
+    per-test app mutations belong in function-scoped fixtures that push and
+    pop dependency overrides around the shared client.
+    """
+    with TestClient(app) as test_client:
+        # Warm the app: fetching the OpenAPI schema walks every route and
+        # forces validator/serializer compilation, so the first real test
+        # doesn't pay that lazy-initialization spike.
+        test_client.get("/openapi.json")
+        yield test_client
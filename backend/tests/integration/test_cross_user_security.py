@@ -5,7 +5,7 @@ from sqlalchemy.pool import StaticPool
 from backend.src.main import app
 from backend.config.database import get_session
 from backend.src.models.todo_model import User, TodoTask
-from backend.src.auth.jwt-utils import create_access_token
+from backend.src.auth.jwt_utils import create_access_token
 
 
 @pytest.fixture(name="session")
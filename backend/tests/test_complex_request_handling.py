@@ -6,339 +6,362 @@ result in correct responses with prioritized tasks.
 """
 
 import pytest
-from unittest.mock import patch, MagicMock
-from sqlmodel import Session
-from backend.services.openai_agent_service import OpenAIAgentService
+from unittest.mock import patch, MagicMock, create_autospec
 from backend.services.todo_tools import TodoTools
-from backend.models.task import Task
+import copy
 import uuid
 from datetime import datetime
 
 
-@pytest.fixture
+# Frozen timestamp used for every sample todo. The tests only compare these
+# values as strings, so a constant keeps them deterministic and avoids
+# repeated datetime construction.
+NOW = datetime(2026, 2, 8, 10, 30, 0)
+NOW_ISO = NOW.isoformat()
+
+
+# Autospec template built once at import. create_autospec walks the whole
+# TodoTools API with dir()/inspect.signature, so paying that cost a single
+# time and shallow-copying per test keeps the spec checking without the
+# per-test introspection.
+_TODO_TOOLS_SPEC = create_autospec(TodoTools, instance=True)
+
+
+# Sample todos for the high-priority reminder test, built once at import
+# time. The test only ever reads these as plain dict fields, so there is no
+# need to stage MagicMock Task objects or call datetime.utcnow() per run.
+_SAMPLE_TODOS = [
+    {
+        "id": "11111111-1111-4111-8111-111111111111",
+        "title": "Complete project proposal",
+        "description": "Finish the Q1 project proposal",
+        "completed": False,
+        "priority": "high",
+        "created_at": NOW_ISO,
+        "updated_at": NOW_ISO,
+    },
+    {
+        "id": "22222222-2222-4222-8222-222222222222",
+        "title": "Schedule team meeting",
+        "description": "Schedule quarterly team meeting",
+        "completed": False,
+        "priority": "high",
+        "created_at": NOW_ISO,
+        "updated_at": NOW_ISO,
+    },
+    {
+        "id": "33333333-3333-4333-8333-333333333333",
+        "title": "Update documentation",
+        "description": "Update API documentation",
+        "completed": False,
+        "priority": "medium",
+        "created_at": NOW_ISO,
+        "updated_at": NOW_ISO,
+    },
+]
+
+
+# Fixed todos for the overdue and context-aware scenarios below.
+_OVERDUE_TODO = {
+    "id": "44444444-4444-4444-8444-444444444444",
+    "title": "Submit expense report",
+    "description": "Submit Q4 expense report",
+    "completed": False,
+    "priority": "high",
+    "due_date": "2025-12-01T00:00:00",
+    "created_at": NOW_ISO,
+    "updated_at": NOW_ISO,
+}
+
+_BLOG_TODO = {
+    "id": "55555555-5555-4555-8555-555555555555",
+    "title": "Write blog post",
+    "description": "Draft monthly blog post",
+    "completed": False,
+    "priority": "medium",
+    "created_at": NOW_ISO,
+    "updated_at": NOW_ISO,
+}
+
+
+# Table driving test_complex_requests: one row per scenario. Each row gives
+# the user message, the TodoTools return values to stage, the tool calls the
+# mocked model emits (argument templates take the user id via %s), the model
+# reply, the substrings expected in the response, and the tool whose call is
+# asserted.
+_COMPLEX_REQUEST_CASES = [
+    pytest.param(
+        "Remind me about high priority tasks",
+        {"list_todos": {"todos": _SAMPLE_TODOS}},
+        [("list_todos", '{"user_id": "%s", "limit": 100}')],
+        (
+            "Here are your high priority tasks:\n\n"
+            "1. Complete project proposal\n"
+            "2. Schedule team meeting\n\n"
+            "Would you like me to help you plan how to tackle these?"
+        ),
+        ["high priority", "Complete project proposal", "Schedule team meeting"],
+        "list_todos",
+        id="high-priority-reminder",
+    ),
+    pytest.param(
+        "Show me overdue tasks",
+        {
+            "get_user_context": {
+                "context": {
+                    "reminder_stats": {
+                        "overdue_reminders": 1,
+                        "upcoming_reminders": 2,
+                    }
+                }
+            },
+            "list_todos": {"todos": [_OVERDUE_TODO]},
+        },
+        [
+            ("get_user_context", '{"user_id": "%s"}'),
+            ("list_todos", '{"user_id": "%s", "completed": false}'),
+        ],
+        (
+            "I found 1 overdue task:\n\n"
+            "• Submit expense report (was due: Dec 1, 2025)\n\n"
+            "Would you like me to help you prioritize this?"
+        ),
+        ["overdue", "Submit expense report"],
+        "list_todos",
+        id="overdue-reminders",
+    ),
+    pytest.param(
+        "I need to work on urgent tasks. Can you review my list?",
+        {
+            "list_todos": {"todos": [_BLOG_TODO]},
+            "update_todo": {
+                "success": True,
+                "todo": {**_BLOG_TODO, "priority": "high"},
+                "context_changes_applied": ["priority_updated"],
+            },
+        },
+        [
+            ("list_todos", '{"user_id": "%s"}'),
+            (
+                "update_todo",
+                '{"user_id": "%s", "todo_id": "' + _BLOG_TODO["id"] + '", "priority": "high"}',
+            ),
+        ],
+        (
+            "I noticed you have a blog post task that might be time-sensitive. "
+            "I've updated its priority to high to ensure it gets attention. "
+            "You can always adjust this back if needed."
+        ),
+        ["time-sensitive", "updated its priority"],
+        "update_todo",
+        id="context-aware-update",
+    ),
+]
+
+
+@pytest.fixture(scope="module")
 def mock_session():
-    """Create a mock database session for testing."""
+    """Create a mock database session shared across the module.
+
+    Tests never assert call counts on the session itself, so one MagicMock
+    is safe to reuse and avoids re-introspecting the Session spec per test.
+    """
+    from sqlmodel import Session
+
     session = MagicMock(spec=Session)
+    # An empty message history: the history builder iterates exec().all()
+    session.exec.return_value.all.return_value = []
     return session
 
 
+@pytest.fixture(scope="module")
+def agent_service(mock_session, openai_stub):
+    """Create one OpenAIAgentService shared by all tests in this module.
+
+    The constructor builds the tool schemas and wires TodoTools on every
+    instantiation; amortizing that over the module keeps per-test setup to
+    swapping in a mocked todo_tools. The stub client is injected through
+    the constructor — without it the service silently falls back to stub
+    AI when OPENAI_API_KEY is unset and never reads staged completions.
+    """
+    from backend.services.openai_agent_service import OpenAIAgentService
+
+    return OpenAIAgentService(mock_session, openai_client=openai_stub)
+
+
+def _install_todo_tools(agent_service, tools):
+    """Point the service, including its tool dispatch table, at ``tools``.
+
+    tool_functions binds the TodoTools methods at construction time, so
+    assigning agent_service.todo_tools alone would leave execution wired
+    to the original instance.
+    """
+    agent_service.todo_tools = tools
+    agent_service.tool_functions = {
+        name: getattr(tools, name) for name in agent_service.tool_functions
+    }
+
+
+@pytest.fixture(autouse=True)
+def _restore_todo_tools(agent_service):
+    """Put the real todo_tools back after each test swaps in a mock."""
+    original = agent_service.todo_tools
+    original_functions = agent_service.tool_functions
+    yield
+    agent_service.todo_tools = original
+    agent_service.tool_functions = original_functions
+
+
 @pytest.fixture
 def sample_user_id():
     """Provide a sample user ID for testing."""
     return str(uuid.uuid4())
 
 
-class TestComplexRequestHandling:
-    """Test cases for complex request handling."""
+@pytest.fixture
+def mock_todo_tools():
+    """Clone the module-level TodoTools autospec for one test."""
+    tools = copy.copy(_TODO_TOOLS_SPEC)
+    tools.reset_mock(return_value=True, side_effect=True)
+    return tools
 
-    @patch('backend.services.openai_agent_service.OpenAI')
-    def test_remind_high_priority_tasks(self, mock_openai, mock_session, sample_user_id):
-        """
-        Test that 'Remind me about high priority tasks' returns prioritized tasks.
-        """
-        # Create sample high priority tasks
-        high_priority_task1 = MagicMock()
-        high_priority_task1.id = str(uuid.uuid4())
-        high_priority_task1.title = "Complete project proposal"
-        high_priority_task1.description = "Finish the Q1 project proposal"
-        high_priority_task1.completed = False
-        high_priority_task1.priority = "high"
-        high_priority_task1.created_at = datetime.utcnow()
-        high_priority_task1.updated_at = datetime.utcnow()
-
-        high_priority_task2 = MagicMock()
-        high_priority_task2.id = str(uuid.uuid4())
-        high_priority_task2.title = "Schedule team meeting"
-        high_priority_task2.description = "Schedule quarterly team meeting"
-        high_priority_task2.completed = False
-        high_priority_task2.priority = "high"
-        high_priority_task2.created_at = datetime.utcnow()
-        high_priority_task2.updated_at = datetime.utcnow()
-
-        # Create some lower priority tasks
-        medium_task = MagicMock()
-        medium_task.id = str(uuid.uuid4())
-        medium_task.title = "Update documentation"
-        medium_task.description = "Update API documentation"
-        medium_task.completed = False
-        medium_task.priority = "medium"
-        medium_task.created_at = datetime.utcnow()
-        medium_task.updated_at = datetime.utcnow()
-
-        # Mock the list_todos response
-        mock_todo_tools = MagicMock(spec=TodoTools)
-        mock_todo_tools.list_todos.return_value = {
-            "todos": [
-                {
-                    "id": str(high_priority_task1.id),
-                    "title": high_priority_task1.title,
-                    "description": high_priority_task1.description,
-                    "completed": high_priority_task1.completed,
-                    "priority": high_priority_task1.priority,
-                    "created_at": high_priority_task1.created_at.isoformat(),
-                    "updated_at": high_priority_task1.updated_at.isoformat()
-                },
-                {
-                    "id": str(high_priority_task2.id),
-                    "title": high_priority_task2.title,
-                    "description": high_priority_task2.description,
-                    "completed": high_priority_task2.completed,
-                    "priority": high_priority_task2.priority,
-                    "created_at": high_priority_task2.created_at.isoformat(),
-                    "updated_at": high_priority_task2.updated_at.isoformat()
-                },
-                {
-                    "id": str(medium_task.id),
-                    "title": medium_task.title,
-                    "description": medium_task.description,
-                    "completed": medium_task.completed,
-                    "priority": medium_task.priority,
-                    "created_at": medium_task.created_at.isoformat(),
-                    "updated_at": medium_task.updated_at.isoformat()
-                }
-            ]
-        }
-
-        # Mock OpenAI response that includes a tool call to list todos with priority filter
-        mock_completion = MagicMock()
-        mock_completion.choices = [MagicMock()]
-        mock_completion.choices[0].message = MagicMock()
-        mock_completion.choices[0].message.tool_calls = [
-            MagicMock(
-                function=MagicMock(
-                    name="list_todos",
-                    arguments='{"user_id": "' + sample_user_id + '", "limit": 100}'
-                )
-            )
-        ]
-        mock_completion.choices[0].message.content = (
-            "Here are your high priority tasks:\n\n"
-            "1. Complete project proposal\n"
-            "2. Schedule team meeting\n\n"
-            "Would you like me to help you plan how to tackle these?"
-        )
 
-        mock_client_instance = MagicMock()
-        mock_client_instance.chat = MagicMock()
-        mock_client_instance.chat.completions = MagicMock()
-        mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
+@pytest.fixture(scope="session")
+def openai_stub():
+    """Create one stub OpenAI client shared across the session.
 
-        mock_openai.return_value = mock_client_instance
+    Building the client.chat.completions.create attribute chain allocates a
+    MagicMock per link; doing it once and mutating create.return_value per
+    test avoids repeating that construction.
+    """
+    client = MagicMock()
+    client.chat.completions.create = MagicMock()
+    return client
 
-        # Create agent service instance
-        agent_service = OpenAIAgentService(mock_session)
 
-        # Replace the todo tools with our mock
-        agent_service.todo_tools = mock_todo_tools
+@pytest.fixture(autouse=True)
+def _reset_openai_stub(openai_stub):
+    """Clear the stub client's staged response between tests."""
+    yield
+    openai_stub.chat.completions.create.reset_mock(return_value=True, side_effect=True)
 
-        # Process the complex request
-        result = agent_service.process_message(
-            user_id=sample_user_id,
-            message="Remind me about high priority tasks",
-            session_id=None
-        )
 
-        # Verify that the response contains high priority tasks
-        response_text = result.get("response", "")
-        assert "high priority" in response_text.lower()
-        assert "Complete project proposal" in response_text
-        assert "Schedule team meeting" in response_text
+@pytest.fixture(scope="module")
+def completion_factory(openai_stub):
+    """Build OpenAI completion mocks from a cached skeleton.
 
-        # Verify that lower priority tasks are not emphasized
-        # (The agent should focus on high priority tasks as requested)
-        assert "Update documentation" in response_text or "Update documentation" not in response_text
-        # The key requirement is that high priority tasks are identified
+    Constructing the nested completion -> choices -> message MagicMock tree
+    is the dominant setup cost in these tests, so the skeleton is built once
+    per module and shallow-copied per test; only the content/tool_calls vary.
+    The factory also stages the completion on the shared stub client so
+    tests don't repeat the chat.completions.create plumbing.
+    """
+    skeleton = MagicMock()
+    skeleton.choices = [MagicMock()]
 
-        # Verify that the list_todos tool was called
-        mock_todo_tools.list_todos.assert_called_once()
+    def make(content, tool_calls):
+        completion = copy.copy(skeleton)
+        completion.choices[0].message.tool_calls = tool_calls
+        completion.choices[0].message.content = content
 
-    @patch('backend.services.openai_agent_service.OpenAI')
-    def test_overdue_reminders_request(self, mock_openai, mock_session, sample_user_id):
-        """
-        Test that requests for overdue items return appropriate responses.
-        """
-        # Mock overdue tasks
-        overdue_task = MagicMock()
-        overdue_task.id = str(uuid.uuid4())
-        overdue_task.title = "Submit expense report"
-        overdue_task.description = "Submit Q4 expense report"
-        overdue_task.completed = False
-        overdue_task.priority = "high"
-        overdue_task.due_date = datetime(2025, 12, 1)  # Past date
-        overdue_task.created_at = datetime.utcnow()
-        overdue_task.updated_at = datetime.utcnow()
-
-        mock_todo_tools = MagicMock(spec=TodoTools)
-        mock_todo_tools.get_user_context.return_value = {
-            "user_id": sample_user_id,
-            "context": {
-                "reminder_stats": {
-                    "overdue_reminders": 1,
-                    "upcoming_reminders": 2
-                }
-            }
-        }
-        mock_todo_tools.list_todos.return_value = {
-            "todos": [
-                {
-                    "id": str(overdue_task.id),
-                    "title": overdue_task.title,
-                    "description": overdue_task.description,
-                    "completed": overdue_task.completed,
-                    "priority": overdue_task.priority,
-                    "due_date": overdue_task.due_date.isoformat(),
-                    "created_at": overdue_task.created_at.isoformat(),
-                    "updated_at": overdue_task.updated_at.isoformat()
-                }
-            ]
-        }
-
-        # Mock OpenAI response
-        mock_completion = MagicMock()
-        mock_completion.choices = [MagicMock()]
-        mock_completion.choices[0].message = MagicMock()
-        mock_completion.choices[0].message.tool_calls = [
-            MagicMock(
-                function=MagicMock(
-                    name="get_user_context",
-                    arguments='{"user_id": "' + sample_user_id + '"}'
-                )
-            ),
-            MagicMock(
-                function=MagicMock(
-                    name="list_todos",
-                    arguments='{"user_id": "' + sample_user_id + '", "completed": false}'
-                )
-            )
-        ]
-        mock_completion.choices[0].message.content = (
-            "I found 1 overdue task:\n\n"
-            "• Submit expense report (was due: Dec 1, 2025)\n\n"
-            "Would you like me to help you prioritize this?"
-        )
+        openai_stub.chat.completions.create.return_value = completion
+        return completion
 
-        mock_client_instance = MagicMock()
-        mock_client_instance.chat = MagicMock()
-        mock_client_instance.chat.completions = MagicMock()
-        mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
+    return make
 
-        mock_openai.return_value = mock_client_instance
 
-        agent_service = OpenAIAgentService(mock_session)
-        agent_service.todo_tools = mock_todo_tools
+def _mock_tool_call(tool_name, arguments):
+    """Build a mocked OpenAI tool call with a real .name attribute.
 
-        result = agent_service.process_message(
-            user_id=sample_user_id,
-            message="Show me overdue tasks",
-            session_id=None
-        )
+    MagicMock(name=...) would configure the mock's repr name instead of
+    setting a name attribute, so assign it after construction.
+    """
+    call = MagicMock()
+    call.function.name = tool_name
+    call.function.arguments = arguments
+    return call
 
-        # Verify the response addresses overdue tasks
-        response_text = result.get("response", "")
-        assert "overdue" in response_text.lower()
-        assert "Submit expense report" in response_text
 
-    @patch('backend.services.openai_agent_service.OpenAI')
-    def test_context_aware_task_modification(self, mock_openai, mock_session, sample_user_id):
+class TestComplexRequestHandling:
+    """Test cases for complex request handling."""
+
+    @pytest.mark.parametrize(
+        "message,tool_returns,tool_calls,content,expected_substrings,called_tool",
+        _COMPLEX_REQUEST_CASES,
+    )
+    def test_complex_requests(
+        self,
+        agent_service,
+        sample_user_id,
+        completion_factory,
+        mock_todo_tools,
+        message,
+        tool_returns,
+        tool_calls,
+        content,
+        expected_substrings,
+        called_tool,
+    ):
         """
-        Test context-aware task modification where agent understands user patterns.
+        Test complex requests end to end from one scenario table.
+
+        The high-priority reminder, overdue reminder, and context-aware
+        update scenarios share the same build-mocks / process_message /
+        assert-substrings shape, so each is a row in _COMPLEX_REQUEST_CASES
+        rather than its own copy of the setup.
         """
-        # Mock existing task
-        existing_task = MagicMock()
-        existing_task.id = str(uuid.uuid4())
-        existing_task.title = "Write blog post"
-        existing_task.description = "Draft monthly blog post"
-        existing_task.completed = False
-        existing_task.priority = "medium"
-        existing_task.created_at = datetime.utcnow()
-        existing_task.updated_at = datetime.utcnow()
-
-        mock_todo_tools = MagicMock(spec=TodoTools)
-        mock_todo_tools.list_todos.return_value = {
-            "todos": [
-                {
-                    "id": str(existing_task.id),
-                    "title": existing_task.title,
-                    "description": existing_task.description,
-                    "completed": existing_task.completed,
-                    "priority": existing_task.priority,
-                    "created_at": existing_task.created_at.isoformat(),
-                    "updated_at": existing_task.updated_at.isoformat()
-                }
-            ]
-        }
-        mock_todo_tools.update_todo.return_value = {
-            "success": True,
-            "todo": {
-                "id": str(existing_task.id),
-                "title": existing_task.title,
-                "description": existing_task.description,
-                "completed": False,
-                "priority": "high",  # Updated priority
-                "created_at": existing_task.created_at.isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
-            },
-            "context_changes_applied": ["priority_updated"]
-        }
-
-        # Mock OpenAI response that decides to update priority based on context
-        mock_completion = MagicMock()
-        mock_completion.choices = [MagicMock()]
-        mock_completion.choices[0].message = MagicMock()
-        mock_completion.choices[0].message.tool_calls = [
-            MagicMock(
-                function=MagicMock(
-                    name="list_todos",
-                    arguments='{"user_id": "' + sample_user_id + '"}'
+        # Stage the TodoTools return values for this scenario
+        for tool_name, return_value in tool_returns.items():
+            getattr(mock_todo_tools, tool_name).return_value = return_value
+
+        # Mock the OpenAI reply and the tool calls it requests
+        completion_factory(
+            content=content,
+            tool_calls=[
+                _mock_tool_call(
+                    tool_name,
+                    arguments % sample_user_id if "%s" in arguments else arguments,
                 )
-            ),
-            MagicMock(
-                function=MagicMock(
-                    name="update_todo",
-                    arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "{existing_task.id}", "priority": "high"}}'
-                )
-            )
-        ]
-        mock_completion.choices[0].message.content = (
-            "I noticed you have a blog post task that might be time-sensitive. "
-            "I've updated its priority to high to ensure it gets attention. "
-            "You can always adjust this back if needed."
+                for tool_name, arguments in tool_calls
+            ],
         )
 
-        mock_client_instance = MagicMock()
-        mock_client_instance.chat = MagicMock()
-        mock_client_instance.chat.completions = MagicMock()
-        mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-        mock_openai.return_value = mock_client_instance
-
-        agent_service = OpenAIAgentService(mock_session)
-        agent_service.todo_tools = mock_todo_tools
+        # Replace the todo tools (and the dispatch table) with our mock
+        _install_todo_tools(agent_service, mock_todo_tools)
 
+        # Process the complex request
         result = agent_service.process_message(
             user_id=sample_user_id,
-            message="I need to work on urgent tasks. Can you review my list?",
+            message=message,
             session_id=None
         )
 
-        # Verify the response shows context-aware behavior
+        # Verify the response addresses the scenario
         response_text = result.get("response", "")
-        assert "time-sensitive" in response_text.lower() or "urgent" in response_text.lower()
-        assert "updated its priority" in response_text.lower()
+        for substring in expected_substrings:
+            assert substring.lower() in response_text.lower()
 
-        # Verify update_todo was called to change priority
-        mock_todo_tools.update_todo.assert_called()
+        # Verify the scenario's key tool was invoked
+        getattr(mock_todo_tools, called_tool).assert_called()
 
-    def test_complex_request_edge_cases(self, mock_session, sample_user_id):
+    def test_complex_request_edge_cases(
+        self, agent_service, sample_user_id, completion_factory, mock_todo_tools
+    ):
         """
         Test edge cases for complex request handling.
         """
-        # Test with no tasks
-        mock_todo_tools = MagicMock(spec=TodoTools)
+        # Test with no tasks: the tool returns an empty list and the model
+        # is staged to relay that to the user
         mock_todo_tools.list_todos.return_value = {"todos": []}
 
-        agent_service = OpenAIAgentService(mock_session, use_stub=True)
-        agent_service.todo_tools = mock_todo_tools
+        completion_factory(
+            content="You have no high priority tasks right now. Enjoy the breathing room!",
+            tool_calls=[
+                _mock_tool_call("list_todos", '{"user_id": "%s"}' % sample_user_id)
+            ],
+        )
+
+        _install_todo_tools(agent_service, mock_todo_tools)
 
         result = agent_service.process_message(
             user_id=sample_user_id,
@@ -350,6 +373,7 @@ class TestComplexRequestHandling:
         assert isinstance(result.get("response"), str)
         response_text = result.get("response", "")
         assert "no " in response_text.lower() or "empty" in response_text.lower() or "none" in response_text.lower()
+        mock_todo_tools.list_todos.assert_called()
 
 
 if __name__ == "__main__":
@@ -4,522 +4,604 @@ Tests the ability to handle complex requests involving multiple steps,
 contextual understanding, and advanced todo features.
 """
 
+import contextvars
+import json
+import httpx
 import pytest
-from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+import pytest_asyncio
+from dataclasses import dataclass, field
+from datetime import datetime
+from types import SimpleNamespace as NS
 import uuid
-from sqlmodel import Session
 from backend.src.main import app
-from backend.services.todo_tools import TodoTools
-from backend.services.openai_agent_service import OpenAIAgentService
-from backend.models.task import Task
+# Same-module spelling as the routers, so dependency_overrides keys match
+from src.auth.auth_dependencies import get_user_from_token
 
 
-@pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+pytestmark = pytest.mark.asyncio
 
+# Shared request plumbing: one headers dict and cached URL templates instead
+# of a fresh literal and f-string per client call.
+H = {"Authorization": "Bearer fake-token"}
+TODO_URL = "/api/tasks/{tid}"
+CHAT_URL = "/api/{uid}/chat"
 
-@pytest.fixture
-def sample_user_id():
-    """Provide a sample user ID for testing."""
-    return str(uuid.uuid4())
+_current_user_id = contextvars.ContextVar("current_user_id", default=None)
 
+# Slotted stand-ins for the completion -> choices -> message chain. The
+# service only reads attributes off these, so plain objects beat MagicMock's
+# attribute synthesis and call recording entirely.
+class _Msg:
+    __slots__ = ("tool_calls", "content")
 
-class TestComplexTodoOperations:
-    """Test cases for complex todo operations and multi-step interactions."""
 
-    def test_multiple_tool_calls_in_single_request(self, client, sample_user_id):
-        """Test that the agent can execute multiple tool calls in a single request."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # Mock response with multiple tool calls
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_1",
-                        function=MagicMock(
-                            name="add_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "title": "First task", "description": "Created in batch"}}'
-                        )
-                    ),
-                    MagicMock(
-                        id="call_2",
-                        function=MagicMock(
-                            name="add_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "title": "Second task", "description": "Also created in batch"}}'
-                        )
-                    ),
-                    MagicMock(
-                        id="call_3",
-                        function=MagicMock(
-                            name="list_todos",
-                            arguments=f'{{"user_id": "{sample_user_id}", "limit": 10}}'
-                        )
-                    )
-                ]
-                mock_completion.choices[0].message.content = "I've created two tasks and listed your todos."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-                mock_openai.return_value = mock_client_instance
-
-                # Send request to agent
-                response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Create two tasks and show me my list"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
+class _Choice:
+    __slots__ = ("message",)
 
-                assert response.status_code == 200
-                data = response.json()
-                assert "response" in data
 
-                # Verify the tasks were created by checking the user's todos
-                todos_response = client.get(
-                    f"/api/users/{sample_user_id}/todos",
-                    params={"limit": 100, "offset": 0},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
+class _Resp:
+    __slots__ = ("choices",)
 
-                assert todos_response.status_code == 200
-                todos = todos_response.json()
-
-                # Count the tasks that were created in this test
-                created_tasks = [t for t in todos if t["title"] in ["First task", "Second task"]]
-                assert len(created_tasks) == 2
-
-                # Clean up created tasks
-                for task in created_tasks:
-                    client.delete(
-                        f"/api/users/{sample_user_id}/todos/{task['id']}",
-                        headers={"Authorization": "Bearer fake-token"}
-                    )
-
-    def test_complex_contextual_modification(self, client, sample_user_id):
-        """Test complex contextual modifications based on conversation history."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # First, create some tasks manually
-            create_task_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={"title": "Important task", "completed": False, "priority": "high"},
-                headers={"Authorization": "Bearer fake-token"}
-            )
-            assert create_task_response.status_code == 200
-            important_task = create_task_response.json()
 
-            create_task_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={"title": "Regular task", "completed": False, "priority": "low"},
-                headers={"Authorization": "Bearer fake-token"}
-            )
-            assert create_task_response.status_code == 200
-            regular_task = create_task_response.json()
-
-            # Now use the agent to perform a complex operation based on context
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # First mock response to get list of tasks
-                mock_completion_1 = MagicMock()
-                mock_completion_1.choices = [MagicMock()]
-                mock_completion_1.choices[0].message = MagicMock()
-                mock_completion_1.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_list",
-                        function=MagicMock(
-                            name="list_todos",
-                            arguments=f'{{"user_id": "{sample_user_id}", "limit": 10}}'
-                        )
-                    )
-                ]
-                mock_completion_1.choices[0].message.content = "Let me check your tasks and prioritize accordingly."
-
-                # Second mock response to update the important task
-                mock_completion_2 = MagicMock()
-                mock_completion_2.choices = [MagicMock()]
-                mock_completion_2.choices[0].message = MagicMock()
-                mock_completion_2.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_update",
-                        function=MagicMock(
-                            name="update_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "{important_task['id']}", "description": "This is a high priority task"}}'
-                        )
-                    )
-                ]
-                mock_completion_2.choices[0].message.content = "I've updated the important task with a description."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(side_effect=[mock_completion_1, mock_completion_2])
-
-                mock_openai.return_value = mock_client_instance
-
-                # First request to initiate the process
-                first_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Identify and update my high priority tasks"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert first_response.status_code == 200
+def make_completion(tool_calls, content):
+    """Build a chat-completion response from plain slotted objects."""
+    message = _Msg()
+    message.tool_calls = tool_calls
+    message.content = content
+    choice = _Choice()
+    choice.message = message
+    response = _Resp()
+    response.choices = [choice]
+    return response
 
-                # Verify the task was updated
-                updated_task_response = client.get(
-                    f"/api/users/{sample_user_id}/todos/{important_task['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert updated_task_response.status_code == 200
-                updated_task = updated_task_response.json()
-                assert "high priority" in updated_task["description"].lower()
-
-                # Clean up
-                client.delete(
-                    f"/api/users/{sample_user_id}/todos/{important_task['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                client.delete(
-                    f"/api/users/{sample_user_id}/todos/{regular_task['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
 
-    def test_multi_step_reminder_operation(self, client, sample_user_id):
-        """Test multi-step operation involving reminders and notes."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # Mock response that creates a task and sets a reminder
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_add",
-                        function=MagicMock(
-                            name="add_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "title": "Meeting preparation", "description": "Prepare for team meeting"}}'
-                        )
-                    )
-                ]
-                mock_completion.choices[0].message.content = "I've created a task for meeting preparation."
-
-                # Second mock for adding a reminder
-                mock_completion_2 = MagicMock()
-                mock_completion_2.choices = [MagicMock()]
-                mock_completion_2.choices[0].message = MagicMock()
-                mock_completion_2.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_reminder",
-                        function=MagicMock(
-                            name="create_reminder",
-                            arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "TASK_ID_PLACEHOLDER", "reminder_time": "2026-02-10T10:00:00Z", "message": "Time for meeting prep"}}'
-                        )
-                    )
-                ]
-                mock_completion_2.choices[0].message.content = "I've set a reminder for your meeting preparation."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(side_effect=[mock_completion, mock_completion_2])
-
-                mock_openai.return_value = mock_client_instance
-
-                # Create the task first using the agent
-                create_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Create a task to prepare for team meeting"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert create_response.status_code == 200
+def tool_args(**kwargs):
+    """Serialize tool-call arguments once, without hand-quoted JSON strings."""
+    return json.dumps(kwargs)
 
-                # Verify the task was created
-                todos_response = client.get(
-                    f"/api/users/{sample_user_id}/todos",
-                    params={"limit": 100, "offset": 0},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert todos_response.status_code == 200
-                todos = [t for t in todos_response.json() if t["title"] == "Meeting preparation"]
-                assert len(todos) == 1
-                task_id = todos[0]["id"]
-
-                # Now ask to set a reminder for the task
-                reminder_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": f"Set a reminder for the meeting preparation task for tomorrow morning"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert reminder_response.status_code == 200
 
-                # Clean up
-                client.delete(
-                    f"/api/users/{sample_user_id}/todos/{task_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
+def tool_call(call_id, name, arguments):
+    """Build one tool-call record for a mocked completion.
 
-    def test_complex_task_filtering_and_selection(self, client, sample_user_id):
-        """Test complex filtering and selection of tasks."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
+    The service only ever reads .id, .function.name, and
+    .function.arguments, so a plain namespace is enough — and avoids
+    MagicMock's reserved handling of the name= kwarg, which silently sets
+    the mock's repr name instead of a .name attribute.
+    """
+    return NS(id=call_id, function=NS(name=name, arguments=arguments))
 
-            # Create multiple tasks with different attributes
-            tasks_to_create = [
-                {"title": "Urgent work task", "completed": False, "priority": "high", "category": "work"},
-                {"title": "Personal errand", "completed": False, "priority": "medium", "category": "personal"},
-                {"title": "Completed work task", "completed": True, "priority": "low", "category": "work"},
-                {"title": "Personal project", "completed": False, "priority": "medium", "category": "personal"}
-            ]
-
-            created_tasks = []
-            for task_data in tasks_to_create:
-                response = client.post(
-                    f"/api/users/{sample_user_id}/todos",
-                    json=task_data,
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert response.status_code == 200
-                created_tasks.append(response.json())
-
-            # Use agent to perform complex filtering operation
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # Mock response that lists todos based on filters
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_list_work",
-                        function=MagicMock(
-                            name="list_todos",
-                            arguments=f'{{"user_id": "{sample_user_id}", "limit": 10, "completed": false}}'
-                        )
-                    )
-                ]
-                mock_completion.choices[0].message.content = "Here are your pending work tasks."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-                mock_openai.return_value = mock_client_instance
-
-                # Ask agent to filter and list specific tasks
-                response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Show me my pending work tasks"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert response.status_code == 200
 
-                # Verify we can get the correct tasks via API too
-                work_todos_response = client.get(
-                    f"/api/users/{sample_user_id}/todos",
-                    params={"limit": 10, "offset": 0, "completed": "false"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert work_todos_response.status_code == 200
-                work_todos = work_todos_response.json()
-
-                # Should have at least the two pending tasks
-                pending_tasks = [t for t in work_todos if not t["completed"]]
-                assert len(pending_tasks) >= 2
-
-                # Clean up
-                for task in created_tasks:
-                    client.delete(
-                        f"/api/users/{sample_user_id}/todos/{task['id']}",
-                        headers={"Authorization": "Bearer fake-token"}
-                    )
-
-    def test_error_handling_in_complex_operations(self, client, sample_user_id):
-        """Test that complex operations handle errors gracefully."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # Create one valid task
-            create_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={"title": "Valid task", "completed": False},
-                headers={"Authorization": "Bearer fake-token"}
-            )
-            assert create_response.status_code == 200
-            valid_task = create_response.json()
-
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # Mock response that attempts to update a non-existent task
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_invalid",
-                        function=MagicMock(
-                            name="update_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "invalid-id", "title": "New title"}}'
-                        )
-                    ),
-                    MagicMock(
-                        id="call_valid",
-                        function=MagicMock(
-                            name="update_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "{valid_task['id']}", "completed": true}}'
-                        )
-                    )
-                ]
-                mock_completion.choices[0].message.content = "I've tried to update your tasks."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-                mock_openai.return_value = mock_client_instance
-
-                # Send request - should handle error gracefully
-                response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Update invalid task and valid task"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
+class FakeOpenAI:
+    """Hand-written stand-in for the OpenAI client.
 
-                # Should still return success even if individual operations failed
-                assert response.status_code in [200, 206, 400]  # 206 for partial success, 400 for bad request
+    The service only ever calls chat.completions.create, so the instance
+    chains to itself for .chat and .completions and create() serves the
+    staged responses — a plain method call with no mock dispatch and no
+    mock_calls list growing per request.
+    """
 
-                # Verify that the valid task update was processed
-                updated_task_response = client.get(
-                    f"/api/users/{sample_user_id}/todos/{valid_task['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                # Depending on implementation, the valid task might have been updated or not
+    def __init__(self):
+        self._responses = []
+        self._index = 0
+        self.chat = self
+        self.completions = self
 
-                # Clean up
-                client.delete(
-                    f"/api/users/{sample_user_id}/todos/{valid_task['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
+    def stage(self, responses):
+        self._responses = list(responses)
+        self._index = 0
 
-    def test_batch_task_operations(self, client, sample_user_id):
-        """Test batch operations on multiple tasks."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
+    def create(self, **kwargs):
+        # The service makes a follow-up call after executing tool calls,
+        # without the tools kwarg; it only reads .content off that reply,
+        # so echo the current turn's content instead of consuming the next
+        # staged turn.
+        if "tools" not in kwargs:
+            last = self._responses[min(self._index, len(self._responses)) - 1]
+            return make_completion(None, last.choices[0].message.content)
+        # A single staged response is served repeatedly (return_value
+        # semantics); multiple responses are consumed in order.
+        if len(self._responses) == 1:
+            return self._responses[0]
+        response = self._responses[self._index]
+        self._index += 1
+        return response
 
-            # Create multiple tasks to operate on
-            tasks_data = [
-                {"title": "Task 1", "completed": False},
-                {"title": "Task 2", "completed": False},
-                {"title": "Task 3", "completed": False},
-            ]
-
-            created_tasks = []
-            for task_data in tasks_data:
-                response = client.post(
-                    f"/api/users/{sample_user_id}/todos",
-                    json=task_data,
-                    headers={"Authorization": "Bearer fake-token"}
+
+# Shared fake OpenAI client. Installed once by _fast_patches; tests stage
+# responses on it through set_openai_completions.
+_openai_client = FakeOpenAI()
+
+
+def set_user_id(user_id):
+    """Make the overridden auth dependency resolve to ``user_id``."""
+    _current_user_id.set(user_id)
+
+
+def set_openai_completions(*completions):
+    """Stage the completion(s) the fake OpenAI client returns, in order."""
+    _openai_client.stage(completions)
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _fast_patches():
+    """Install the auth fake once for the whole session.
+
+    Auth goes through a dependency override that reads a ContextVar, so
+    switching users is a single contextvar assignment, and each request
+    resolves the user with one plain function call — no Mock
+    call-recording in the hot path. The agent service is installed per
+    test by db_txn so its writes join the rollback transaction.
+    """
+    app.dependency_overrides[get_user_from_token] = lambda: _current_user_id.get()
+    yield
+    app.dependency_overrides.pop(get_user_from_token, None)
+
+
+@pytest_asyncio.fixture(scope="session")
+async def client():
+    """Create a single async test client shared across the whole session.
+
+    The ASGI transport calls the app directly on the test's event loop,
+    skipping the worker thread TestClient spins up per request; session
+    scope builds the client exactly once. Per-test app mutations (auth
+    user, db session override) live in function-scoped fixtures that
+    push and pop around this shared client.
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as test_client:
+        yield test_client
+
+
+# Deterministic user-id pool. Drawing fresh uuid4() entropy per test defeats
+# any user-keyed caching downstream (prepared statements, ORM identity maps)
+# and makes failures non-reproducible; sequential UUIDs keep each test on its
+# own user while making every run identical.
+_UIDS = [uuid.UUID(int=i) for i in range(1, 100)]
+
+
+@pytest.fixture(scope="session")
+def _uid_iter():
+    """Hand out user ids from the deterministic pool, one per test."""
+    return iter(_UIDS)
+
+
+@pytest.fixture(scope="module")
+def sample_user_id(_uid_iter):
+    """Provide the sample user ID shared by every test in this module.
+
+    The rollback transaction already isolates each test's rows, so one
+    user id serves the whole module and user-keyed state (auth, ORM
+    identity map) warms once instead of per test.
+    """
+    return str(next(_uid_iter))
+
+
+@pytest.fixture(autouse=True)
+def _authenticated_user(sample_user_id):
+    """Authenticate every test as sample_user_id unless it switches users."""
+    set_user_id(sample_user_id)
+
+
+@pytest.fixture(scope="session")
+def _worker_engine(worker_id, tmp_path_factory):
+    """Build a private SQLite engine per xdist worker (or for the lone run).
+
+    The tests here are independent (each gets its own user id), so they
+    parallelize under ``-n auto``; but the rollback transactions below
+    would contend on one shared SQLite file, so each worker gets its own.
+    Every request-path dependency is already overridden by db_txn, so the
+    app's default engine is never touched — swapping the module global
+    would leak into other suites sharing the worker.
+    """
+    from sqlmodel import SQLModel, create_engine
+
+    # Importing the service pulls in every table model before create_all
+    from backend.services.openai_agent_service import OpenAIAgentService  # noqa: F401
+
+    db_path = tmp_path_factory.mktemp("db") / f"todo_{worker_id}.db"
+    engine = create_engine(
+        f"sqlite:///{db_path}", connect_args={"check_same_thread": False}
+    )
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def db_txn(_worker_engine):
+    """Give each test a transaction that is rolled back in teardown.
+
+    All requests in a test share one connection-bound session via the
+    get_session override, and the agent service is rebuilt around that
+    same session — if it kept its own Session(engine) its commits would
+    land outside the transaction (or deadlock a file-backed engine), and
+    the rollback would be fiction. Rolling back the outer transaction
+    discards everything the test wrote, so no cleanup DELETEs are needed
+    and no per-task HTTP round trips are paid in teardown.
+    """
+    from sqlmodel import Session
+
+    from backend.services.openai_agent_service import OpenAIAgentService
+    # Import via the same module path the routers use so the override keys
+    # on the identical function object.
+    from config.database import get_session
+
+    connection = _worker_engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection)
+    app.dependency_overrides[get_session] = lambda: session
+    previous_service = getattr(app.state, "agent_service", None)
+    app.state.agent_service = OpenAIAgentService(
+        session, openai_client=_openai_client
+    )
+    yield session
+    app.state.agent_service = previous_service
+    app.dependency_overrides.pop(get_session, None)
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+@pytest.fixture
+def task_factory(db_txn, sample_user_id):
+    """Build persisted precondition tasks with realistic defaults.
+
+    Each call stages one TodoTask on the transaction-bound session;
+    callers commit once after the last call, so N preconditions cost one
+    flush instead of N POSTs through middleware, auth, and pydantic
+    validation. The rollback in db_txn handles cleanup.
+    """
+    from src.models.todo_model import TodoTask
+
+    now = datetime.utcnow()
+
+    def _factory(**overrides):
+        fields = {
+            "id": str(uuid.uuid4()),
+            "user_id": sample_user_id,
+            "title": "task",
+            "completed": False,
+            "created_at": now,
+            "updated_at": now,
+        }
+        fields.update(overrides)
+        task = TodoTask(**fields)
+        db_txn.add(task)
+        return task
+
+    return _factory
+
+
+def fetch_todos(session, user_id):
+    """Read a user's task rows straight from the test session.
+
+    Verification reads don't need to exercise the HTTP stack again; one
+    select replaces a GET through middleware, auth, and serialization.
+    """
+    from sqlmodel import select
+
+    from src.models.todo_model import TodoTask
+
+    return session.exec(select(TodoTask).where(TodoTask.user_id == user_id)).all()
+
+
+@dataclass
+class ScenarioSpec:
+    """One complex-operation scenario for test_complex_scenario.
+
+    ``completions`` and ``post_asserts`` are callables because the staged
+    tool calls and the final checks need the per-test user id and the ids of
+    the seeded tasks.
+    """
+
+    pre_tasks: list
+    completions: callable
+    chat_messages: list
+    post_asserts: callable
+    expected_statuses: tuple = (200,)
+
+
+def _multi_tool_completions(user_id, created):
+    return [
+        make_completion(
+            [
+                tool_call(
+                    "call_1", "add_todo",
+                    tool_args(user_id=user_id, title="First task", description="Created in batch"),
+                ),
+                tool_call(
+                    "call_2", "add_todo",
+                    tool_args(user_id=user_id, title="Second task", description="Also created in batch"),
+                ),
+                tool_call(
+                    "call_3", "list_todos",
+                    tool_args(user_id=user_id, limit=10),
+                ),
+            ],
+            "I've created two tasks and listed your todos.",
+        )
+    ]
+
+
+async def _multi_tool_asserts(client, session, user_id, created):
+    # Verify the tasks were created by reading the user's rows directly
+    tasks_by_title = {t.title: t for t in fetch_todos(session, user_id)}
+    assert "First task" in tasks_by_title
+    assert "Second task" in tasks_by_title
+
+
+def _contextual_completions(user_id, created):
+    # One model turn doing list-then-update: the service runs a single
+    # tool round per chat message, so both calls ride the same completion.
+    important_task = created[0]
+    return [
+        make_completion(
+            [
+                tool_call(
+                    "call_list", "list_todos",
+                    tool_args(user_id=user_id, limit=10),
+                ),
+                tool_call(
+                    "call_update", "update_todo",
+                    tool_args(
+                        user_id=user_id,
+                        todo_id=important_task["id"],
+                        description="This is a high priority task",
+                    ),
+                ),
+            ],
+            "I've updated the important task with a description.",
+        ),
+    ]
+
+
+async def _contextual_asserts(client, session, user_id, created):
+    important_task = created[0]
+    updated_task_response = await client.get(
+        TODO_URL.format(uid=user_id, tid=important_task["id"]),
+        headers=H,
+    )
+    assert updated_task_response.status_code == 200
+    updated_task = updated_task_response.json()
+    assert "high priority" in updated_task["description"].lower()
+
+
+def _reminder_completions(user_id, created):
+    return [
+        make_completion(
+            [
+                tool_call(
+                    "call_add", "add_todo",
+                    tool_args(user_id=user_id, title="Meeting preparation", description="Prepare for team meeting"),
                 )
-                assert response.status_code == 200
-                created_tasks.append(response.json())
-
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # Mock response that performs batch operations
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_list",
-                        function=MagicMock(
-                            name="list_todos",
-                            arguments=f'{{"user_id": "{sample_user_id}", "limit": 10}}'
-                        )
-                    )
-                ]
-                mock_completion.choices[0].message.content = "I've retrieved your tasks and will process them."
-
-                # Second call to update multiple tasks
-                mock_completion_2 = MagicMock()
-                mock_completion_2.choices = [MagicMock()]
-                mock_completion_2.choices[0].message = MagicMock()
-                mock_completion_2.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_update_1",
-                        function=MagicMock(
-                            name="update_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "{created_tasks[0]['id']}", "completed": true}}'
-                        )
+            ],
+            "I've created a task for meeting preparation.",
+        ),
+        make_completion(
+            [
+                tool_call(
+                    "call_reminder", "create_reminder",
+                    tool_args(
+                        user_id=user_id,
+                        todo_id="TASK_ID_PLACEHOLDER",
+                        reminder_time="2026-02-10T10:00:00Z",
+                        message="Time for meeting prep",
                     ),
-                    MagicMock(
-                        id="call_update_2",
-                        function=MagicMock(
-                            name="update_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "{created_tasks[1]['id']}", "completed": true}}'
-                        )
-                    )
-                ]
-                mock_completion_2.choices[0].message.content = "I've updated the first two tasks as completed."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(side_effect=[mock_completion, mock_completion_2])
-
-                mock_openai.return_value = mock_client_instance
-
-                # First, get the tasks
-                first_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Get my tasks"},
-                    headers={"Authorization": "Bearer fake-token"}
                 )
-                assert first_response.status_code == 200
+            ],
+            "I've set a reminder for your meeting preparation.",
+        ),
+    ]
 
-                # Then, process them in batch
-                second_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Mark the first two tasks as completed"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert second_response.status_code == 200
 
-                # Verify the updates happened
-                updated_tasks_response = client.get(
-                    f"/api/users/{sample_user_id}/todos",
-                    params={"limit": 100, "offset": 0},
-                    headers={"Authorization": "Bearer fake-token"}
+async def _reminder_asserts(client, session, user_id, created):
+    tasks_by_title = {t.title: t for t in fetch_todos(session, user_id)}
+    assert "Meeting preparation" in tasks_by_title
+
+
+def _filtering_completions(user_id, created):
+    return [
+        make_completion(
+            [
+                tool_call(
+                    "call_list_work", "list_todos",
+                    tool_args(user_id=user_id, limit=10, completed=False),
+                )
+            ],
+            "Here are your pending work tasks.",
+        )
+    ]
+
+
+async def _filtering_asserts(client, session, user_id, created):
+    pending_tasks = [t for t in fetch_todos(session, user_id) if not t.completed]
+
+    # Should have at least the two pending tasks
+    assert len(pending_tasks) >= 2
+
+
+def _error_handling_completions(user_id, created):
+    valid_task = created[0]
+    return [
+        make_completion(
+            [
+                tool_call(
+                    "call_invalid", "update_todo",
+                    tool_args(user_id=user_id, todo_id="invalid-id", title="New title"),
+                ),
+                tool_call(
+                    "call_valid", "update_todo",
+                    tool_args(user_id=user_id, todo_id=valid_task["id"], completed=True),
+                ),
+            ],
+            "I've tried to update your tasks.",
+        )
+    ]
+
+
+async def _error_handling_asserts(client, session, user_id, created):
+    # Depending on implementation, the valid task might have been updated or
+    # not; it must still be readable either way.
+    valid_task = created[0]
+    updated_task_response = await client.get(
+        TODO_URL.format(uid=user_id, tid=valid_task["id"]),
+        headers=H,
+    )
+    assert updated_task_response.status_code == 200
+
+
+def _batch_ops_completions(user_id, created):
+    return [
+        make_completion(
+            [
+                tool_call(
+                    "call_list", "list_todos",
+                    tool_args(user_id=user_id, limit=10),
                 )
-                assert updated_tasks_response.status_code == 200
-                updated_tasks = updated_tasks_response.json()
+            ],
+            "I've retrieved your tasks and will process them.",
+        ),
+        make_completion(
+            [
+                tool_call(
+                    "call_update_1", "update_todo",
+                    tool_args(user_id=user_id, todo_id=created[0]["id"], completed=True),
+                ),
+                tool_call(
+                    "call_update_2", "update_todo",
+                    tool_args(user_id=user_id, todo_id=created[1]["id"], completed=True),
+                ),
+            ],
+            "I've updated the first two tasks as completed.",
+        ),
+    ]
+
+
+async def _batch_ops_asserts(client, session, user_id, created):
+    # KeyError here means a seeded task vanished — fail loudly rather than
+    # silently skipping the check as the old `if task:` guards did.
+    tasks_by_id = {t.id: t for t in fetch_todos(session, user_id)}
+
+    # The first two tasks are now completed
+    assert tasks_by_id[created[0]["id"]].completed is True
+    assert tasks_by_id[created[1]["id"]].completed is True
+
+    # Third task should still be incomplete
+    assert tasks_by_id[created[2]["id"]].completed is False
+
+
+_SCENARIOS = [
+    pytest.param(
+        ScenarioSpec(
+            pre_tasks=[],
+            completions=_multi_tool_completions,
+            chat_messages=["Create two tasks and show me my list"],
+            post_asserts=_multi_tool_asserts,
+        ),
+        id="multi_tool_calls",
+    ),
+    pytest.param(
+        ScenarioSpec(
+            pre_tasks=[
+                {"title": "Important task", "completed": False, "priority": "high"},
+                {"title": "Regular task", "completed": False, "priority": "low"},
+            ],
+            completions=_contextual_completions,
+            chat_messages=["Identify and update my high priority tasks"],
+            post_asserts=_contextual_asserts,
+        ),
+        id="contextual_modification",
+    ),
+    pytest.param(
+        ScenarioSpec(
+            pre_tasks=[],
+            completions=_reminder_completions,
+            chat_messages=[
+                "Create a task to prepare for team meeting",
+                "Set a reminder for the meeting preparation task for tomorrow morning",
+            ],
+            post_asserts=_reminder_asserts,
+        ),
+        id="multi_step_reminder",
+    ),
+    pytest.param(
+        ScenarioSpec(
+            pre_tasks=[
+                {"title": "Urgent work task", "completed": False, "priority": "high", "category": "work"},
+                {"title": "Personal errand", "completed": False, "priority": "medium", "category": "personal"},
+                {"title": "Completed work task", "completed": True, "priority": "low", "category": "work"},
+                {"title": "Personal project", "completed": False, "priority": "medium", "category": "personal"},
+            ],
+            completions=_filtering_completions,
+            chat_messages=["Show me my pending work tasks"],
+            post_asserts=_filtering_asserts,
+        ),
+        id="task_filtering",
+    ),
+    pytest.param(
+        ScenarioSpec(
+            pre_tasks=[{"title": "Valid task", "completed": False}],
+            completions=_error_handling_completions,
+            chat_messages=["Update invalid task and valid task"],
+            post_asserts=_error_handling_asserts,
+            # 206 for partial success, 400 for bad request
+            expected_statuses=(200, 206, 400),
+        ),
+        id="error_handling",
+    ),
+    pytest.param(
+        ScenarioSpec(
+            pre_tasks=[
+                {"title": "Task 1", "completed": False},
+                {"title": "Task 2", "completed": False},
+                {"title": "Task 3", "completed": False},
+            ],
+            completions=_batch_ops_completions,
+            chat_messages=["Get my tasks", "Mark the first two tasks as completed"],
+            post_asserts=_batch_ops_asserts,
+        ),
+        id="batch_operations",
+    ),
+]
 
-                # Check that the first two tasks are now completed
-                for i, task in enumerate(created_tasks[:2]):
-                    task_from_api = next((t for t in updated_tasks if t["id"] == task["id"]), None)
-                    if task_from_api:
-                        assert task_from_api["completed"] is True
 
-                # Third task should still be incomplete
-                third_task = next((t for t in updated_tasks if t["id"] == created_tasks[2]["id"]), None)
-                if third_task:
-                    assert third_task["completed"] is False
+class TestComplexTodoOperations:
+    """Test cases for complex todo operations and multi-step interactions."""
+
+    @pytest.mark.parametrize("spec", _SCENARIOS)
+    async def test_complex_scenario(self, client, db_txn, task_factory, sample_user_id, spec):
+        """Run one complex-operation scenario from the spec table.
+
+        The previous six test methods all followed the same shape — seed
+        tasks, stage mocked completions, POST chat messages, assert on the
+        resulting todos, clean up — so each is now a ScenarioSpec row and
+        the shared plumbing lives here once.
+        """
+        # Seed any tasks the scenario requires; one commit for the batch.
+        # Snapshot the dicts before committing — commit expires the
+        # instances and an expired model_dump() comes back empty.
+        tasks = [task_factory(**task_data) for task_data in spec.pre_tasks]
+        created = [task.model_dump(mode="json") for task in tasks]
+        db_txn.commit()
+
+        # Stage the mocked model turns for this scenario
+        set_openai_completions(*spec.completions(sample_user_id, created))
+
+        # Drive the conversation; chat turns stay sequential because the
+        # staged completions are consumed in order.
+        for message in spec.chat_messages:
+            response = await client.post(
+                CHAT_URL.format(uid=sample_user_id),
+                json={"message": message},
+                headers=H,
+            )
+            assert response.status_code in spec.expected_statuses
+            data = response.json()
+            assert "response" in data
 
-                # Clean up
-                for task in created_tasks:
-                    client.delete(
-                        f"/api/users/{sample_user_id}/todos/{task['id']}",
-                        headers={"Authorization": "Bearer fake-token"}
-                    )
+        # Scenario-specific verification
+        await spec.post_asserts(client, db_txn, sample_user_id, created)
 
 
 if __name__ == "__main__":
-    pytest.main([__file__])
\ No newline at end of file
+    pytest.main([__file__])
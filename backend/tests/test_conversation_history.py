@@ -3,368 +3,371 @@ Test suite for conversation history functionality in the AI agent system.
 Tests the ability to maintain and retrieve conversation history between AI agent interactions.
 """
 
+import httpx
 import pytest
+import pytest_asyncio
+from dataclasses import dataclass
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
-import uuid
+from types import SimpleNamespace as NS
+from unittest.mock import patch
+from datetime import datetime
 from sqlmodel import Session, select
-from backend.src.main import app
 from backend.models.agent_session import AgentSession
 from backend.models.agent_message import AgentMessage
 from backend.models.user_context import UserContext
 from backend.services.openai_agent_service import OpenAIAgentService
-from backend.database import get_session
+# Same-module spelling as the routers, so dependency_overrides keys match
+from src.auth.auth_dependencies import get_user_from_token
+from backend.src.main import app
 
 
-@pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+# Request constants shared by every scenario; hoisted so the harness and
+# verify helpers don't rebuild the same dict and f-strings per call.
+HEADERS = {"Authorization": "Bearer fake-token"}
+CHAT_URL = "/api/{uid}/chat"
+CONVERSATIONS_URL = "/api/{uid}/conversations"
+CONVERSATION_URL = "/api/{uid}/conversations/{cid}"
+
+# Frozen timestamp for the persistence test. Passing it explicitly keeps the
+# models' datetime.utcnow default factories from running per insert and makes
+# the stored rows fully deterministic.
+FROZEN_NOW = datetime(2026, 2, 8, 10, 30, 0)
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _app_startup():
+    """Run the app lifespan once for this module.
+
+    ASGITransport calls the app directly and never fires startup events, so
+    table creation would be skipped; entering a TestClient context briefly
+    runs the same lifespan the shared conftest client used to trigger.
+    """
+    with TestClient(app) as startup_client:
+        # Also warms the route table so the first scenario doesn't pay
+        # lazy matcher compilation on its measured request.
+        startup_client.get("/health")
+        yield
+
+
+@pytest_asyncio.fixture
+async def client():
+    """Async client over ASGITransport, overriding the conftest TestClient.
+
+    TestClient proxies every call through a portal into a background event
+    loop thread; ASGITransport awaits the app inside the test's own loop,
+    dropping the per-request thread handoff.
+    """
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://test") as async_client:
+        yield async_client
+
+
+def patch_agent(*responses):
+    """Patch the agent's completion seam to serve canned assistant replies.
+
+    Patching OpenAIAgentService._create_chat_completion sits above the
+    OpenAI SDK's client structure, so the tests no longer build a mocked
+    chat.completions.create chain and keep working as the SDK evolves.
+    Session and message persistence still run for real — that is what
+    these tests assert on.
+    """
+    return patch.object(
+        OpenAIAgentService,
+        "_create_chat_completion",
+        side_effect=[
+            NS(choices=[NS(message=NS(tool_calls=[], content=response))])
+            for response in responses
+        ],
+    )
+
+
+# Fixed identity for the whole module. No test asserts uniqueness across
+# tests — conversation ids already scope every read — so regenerating a
+# uuid4 per test bought nothing.
+_SAMPLE_USER_ID = "00000000-0000-0000-0000-000000000001"
 
 
 @pytest.fixture
 def sample_user_id():
     """Provide a sample user ID for testing."""
-    return str(uuid.uuid4())
+    return _SAMPLE_USER_ID
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _auth_override():
+    """Bypass JWT auth at the DI layer for the whole module.
+
+    A dependency_overrides entry replaces the per-test
+    patch('backend.auth.jwt.get_current_user_id') contexts: the override
+    short-circuits token verification before it runs instead of swapping
+    module attributes in and out around each test body. With the user id
+    now constant, one override per module suffices.
+    """
+    app.dependency_overrides[get_user_from_token] = lambda: _SAMPLE_USER_ID
+    yield
+    app.dependency_overrides.pop(get_user_from_token, None)
+
+
+@pytest.fixture(scope="session")
+def memory_session():
+    """Provide a session on an in-memory SQLite engine.
+
+    The direct model-persistence test only needs a working SQLModel
+    session; going through the configured database pays file fsyncs on
+    every commit. StaticPool keeps the single in-memory connection alive
+    for the whole pytest session. autoflush is off because the test
+    flushes explicitly at the one point it needs generated ids, and
+    expire_on_commit is off so post-commit attribute reads don't trigger
+    re-SELECTs.
+    """
+    from sqlalchemy.pool import StaticPool
+    from sqlmodel import SQLModel, create_engine
+
+    engine = create_engine(
+        "sqlite://",
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+    )
+    SQLModel.metadata.create_all(engine)
+    with Session(engine, autoflush=False, expire_on_commit=False) as session:
+        yield session
+
+
+@dataclass
+class ChatScenario:
+    """One chat round-trip scenario for test_chat_scenarios.
+
+    ``verify`` is a callable because the final checks differ per scenario
+    (retrieval shape, message roles, listing, deletion semantics) while
+    the patch/post harness is identical.
+    """
+
+    responses: tuple
+    messages: tuple
+    chain: bool  # reuse the first reply's conversation_id on later messages
+    verify: callable
+
+
+async def _verify_creation_and_retrieval(client, user_id, conversation_id):
+    # Retrieve the conversation
+    response = await client.get(
+        CONVERSATION_URL.format(uid=user_id, cid=conversation_id), headers=HEADERS
+    )
+    assert response.status_code == 200
+    conv_data = response.json()
+    assert conv_data["conversation"]["id"] == conversation_id
+    assert "messages" in conv_data
+    assert len(conv_data["messages"]) > 0
+
+
+async def _verify_messages_persist(client, user_id, conversation_id):
+    # Both interactions should be present, user and assistant sides alike
+    response = await client.get(
+        CONVERSATION_URL.format(uid=user_id, cid=conversation_id), headers=HEADERS
+    )
+    assert response.status_code == 200
+    conv_data = response.json()
+    assert len(conv_data["messages"]) >= 2
+
+    user_messages = [msg for msg in conv_data["messages"] if msg["role"] == "user"]
+    ai_messages = [msg for msg in conv_data["messages"] if msg["role"] == "assistant"]
+    assert len(user_messages) >= 2
+    assert len(ai_messages) >= 2
+
+
+async def _verify_conversation_listing(client, user_id, conversation_id):
+    response = await client.get(
+        CONVERSATIONS_URL.format(uid=user_id),
+        params={"limit": 10, "offset": 0},
+        headers=HEADERS,
+    )
+    assert response.status_code == 200
+    conversations = response.json()
+    assert isinstance(conversations, list)
+    # Both unchained posts opened their own conversation for this user, so
+    # the listing must actually show multiplicity — otherwise the second
+    # post (and its DB writes) would be wasted setup
+    assert len(conversations) >= 2
+
+
+async def _verify_context_maintained(client, user_id, conversation_id):
+    # The agent had access to previous messages; the history shows both turns
+    response = await client.get(
+        CONVERSATION_URL.format(uid=user_id, cid=conversation_id), headers=HEADERS
+    )
+    assert response.status_code == 200
+    conv_data = response.json()
+    assert len(conv_data["messages"]) >= 2
+
+
+async def _verify_deletion_removes_history(client, user_id, conversation_id):
+    # Verify conversation exists
+    get_response = await client.get(
+        CONVERSATION_URL.format(uid=user_id, cid=conversation_id), headers=HEADERS
+    )
+    assert get_response.status_code == 200
+
+    # Delete the conversation
+    delete_response = await client.delete(
+        CONVERSATION_URL.format(uid=user_id, cid=conversation_id), headers=HEADERS
+    )
+    assert delete_response.status_code == 200
+    assert "deleted" in delete_response.json()["message"].lower()
+
+    # Verify conversation is no longer accessible
+    get_deleted_response = await client.get(
+        CONVERSATION_URL.format(uid=user_id, cid=conversation_id), headers=HEADERS
+    )
+    assert get_deleted_response.status_code in [404, 400]  # Should not be found
+
+
+_CHAT_SCENARIOS = [
+    pytest.param(
+        ChatScenario(
+            responses=("Hello! How can I help you today?",),
+            messages=("Hello, I need help with my tasks",),
+            chain=False,
+            verify=_verify_creation_and_retrieval,
+        ),
+        id="creation-and-retrieval",
+    ),
+    pytest.param(
+        ChatScenario(
+            responses=(
+                "Sure, I can help you with that.",
+                "Is there anything else I can assist with?",
+            ),
+            messages=(
+                "Can you help me organize my tasks?",
+                "Yes, can you show me my current tasks?",
+            ),
+            chain=True,
+            verify=_verify_messages_persist,
+        ),
+        id="messages-persist",
+    ),
+    pytest.param(
+        ChatScenario(
+            responses=("Got it!", "Got it!"),
+            messages=("First conversation message", "Second conversation message"),
+            chain=False,  # two separate conversations
+            verify=_verify_conversation_listing,
+        ),
+        id="list-conversations",
+    ),
+    pytest.param(
+        ChatScenario(
+            responses=(
+                "I've created a task called 'Buy groceries'.",
+                "Regarding the groceries task you mentioned earlier, would you like to add items to the list?",
+            ),
+            messages=(
+                "Create a task to buy groceries",
+                "Tell me about the tasks we talked about",
+            ),
+            chain=True,
+            verify=_verify_context_maintained,
+        ),
+        id="context-maintained",
+    ),
+    pytest.param(
+        ChatScenario(
+            responses=("Hello!",),
+            messages=("Test message for deletion",),
+            chain=False,
+            verify=_verify_deletion_removes_history,
+        ),
+        id="deletion-removes-history",
+    ),
+]
 
 
 class TestConversationHistory:
     """Test cases for conversation history functionality."""
 
-    def test_conversation_session_creation_and_retrieval(self, client, sample_user_id):
-        """Test that conversation sessions are created and can be retrieved."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # Create a conversation by sending a message to the agent
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = []
-                mock_completion.choices[0].message.content = "Hello! How can I help you today?"
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-                mock_openai.return_value = mock_client_instance
-
-                # Send first message to create conversation
-                response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Hello, I need help with my tasks"},
-                    headers={"Authorization": "Bearer fake-token"}
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("scenario", _CHAT_SCENARIOS)
+    async def test_chat_scenarios(self, client, sample_user_id, scenario):
+        """Run one conversation-history scenario from the spec table.
+
+        The five previous test methods shared the same harness — patch the
+        agent, POST chat messages, verify over the API — so each is now a
+        ChatScenario row and only the verification differs.
+        """
+        with patch_agent(*scenario.responses):
+            conversation_id = None
+            for message in scenario.messages:
+                payload = {"message": message}
+                if scenario.chain and conversation_id is not None:
+                    payload["conversation_id"] = conversation_id
+
+                response = await client.post(
+                    CHAT_URL.format(uid=sample_user_id), json=payload, headers=HEADERS
                 )
-
                 assert response.status_code == 200
                 data = response.json()
-                assert "conversation_id" in data
-                conversation_id = data["conversation_id"]
-
-                # Retrieve the conversation
-                get_conv_response = client.get(
-                    f"/api/{sample_user_id}/conversations/{conversation_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-
-                assert get_conv_response.status_code == 200
-                conv_data = get_conv_response.json()
-                assert conv_data["id"] == conversation_id
-                assert "messages" in conv_data
-                assert len(conv_data["messages"]) > 0
-
-    def test_conversation_messages_persist_across_interactions(self, client, sample_user_id):
-        """Test that messages persist in the conversation across multiple interactions."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # First interaction
-                mock_completion_1 = MagicMock()
-                mock_completion_1.choices = [MagicMock()]
-                mock_completion_1.choices[0].message = MagicMock()
-                mock_completion_1.choices[0].message.tool_calls = []
-                mock_completion_1.choices[0].message.content = "Sure, I can help you with that."
-
-                # Second interaction
-                mock_completion_2 = MagicMock()
-                mock_completion_2.choices = [MagicMock()]
-                mock_completion_2.choices[0].message = MagicMock()
-                mock_completion_2.choices[0].message.tool_calls = []
-                mock_completion_2.choices[0].message.content = "Is there anything else I can assist with?"
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(side_effect=[mock_completion_1, mock_completion_2])
-
-                mock_openai.return_value = mock_client_instance
-
-                # First interaction
-                first_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Can you help me organize my tasks?"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert first_response.status_code == 200
-                first_data = first_response.json()
-                conversation_id = first_data["conversation_id"]
-
-                # Second interaction in the same conversation
-                second_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={
-                        "message": "Yes, can you show me my current tasks?",
-                        "conversation_id": conversation_id
-                    },
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert second_response.status_code == 200
-
-                # Retrieve conversation and check that both messages are present
-                get_conv_response = client.get(
-                    f"/api/{sample_user_id}/conversations/{conversation_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-
-                assert get_conv_response.status_code == 200
-                conv_data = get_conv_response.json()
-                assert len(conv_data["messages"]) >= 2  # At least 2 user messages + 2 AI responses
-
-                # Check that messages are properly ordered and include both user and AI messages
-                user_messages = [msg for msg in conv_data["messages"] if msg["role"] == "user"]
-                ai_messages = [msg for msg in conv_data["messages"] if msg["role"] == "assistant"]
-
-                assert len(user_messages) >= 2
-                assert len(ai_messages) >= 2
-
-    def test_list_conversations_returns_multiple_conversations(self, client, sample_user_id):
-        """Test that multiple conversations can be listed for a user."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = []
-                mock_completion.choices[0].message.content = "Got it!"
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-                mock_openai.return_value = mock_client_instance
-
-                # Create first conversation
-                first_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "First conversation message"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert first_response.status_code == 200
-
-                # Create second conversation
-                second_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Second conversation message"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert second_response.status_code == 200
-
-                # List all conversations
-                list_response = client.get(
-                    f"/api/{sample_user_id}/conversations",
-                    params={"limit": 10, "offset": 0},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-
-                assert list_response.status_code == 200
-                conversations = list_response.json()
-                assert isinstance(conversations, list)
-                # Should have at least one conversation
-                assert len(conversations) >= 1
-
-    def test_conversation_history_maintains_context_for_agent(self, client, sample_user_id):
-        """Test that the agent can access conversation history to maintain context."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # Mock response for first interaction
-                mock_completion_1 = MagicMock()
-                mock_completion_1.choices = [MagicMock()]
-                mock_completion_1.choices[0].message = MagicMock()
-                mock_completion_1.choices[0].message.tool_calls = []
-                mock_completion_1.choices[0].message.content = "I've created a task called 'Buy groceries'."
-
-                # Mock response for second interaction that should reference previous context
-                mock_completion_2 = MagicMock()
-                mock_completion_2.choices = [MagicMock()]
-                mock_completion_2.choices[0].message = MagicMock()
-                mock_completion_2.choices[0].message.tool_calls = []
-                mock_completion_2.choices[0].message.content = "Regarding the groceries task you mentioned earlier, would you like to add items to the list?"
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(side_effect=[mock_completion_1, mock_completion_2])
-
-                mock_openai.return_value = mock_client_instance
-
-                # First interaction
-                first_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Create a task to buy groceries"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert first_response.status_code == 200
-                first_data = first_response.json()
-                conversation_id = first_data["conversation_id"]
-
-                # Second interaction in the same conversation
-                second_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={
-                        "message": "Tell me about the tasks we talked about",
-                        "conversation_id": conversation_id
-                    },
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert second_response.status_code == 200
-
-                # Verify the response acknowledges previous context
-                second_data = second_response.json()
-                # The agent should have access to previous messages to provide context-aware responses
-                assert "response" in second_data
-
-                # Check that conversation history contains multiple messages
-                get_conv_response = client.get(
-                    f"/api/{sample_user_id}/conversations/{conversation_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert get_conv_response.status_code == 200
-                conv_data = get_conv_response.json()
-                assert len(conv_data["messages"]) >= 2
-
-    def test_conversation_deletion_removes_history(self, client, sample_user_id):
-        """Test that deleting a conversation removes its history."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = []
-                mock_completion.choices[0].message.content = "Hello!"
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-                mock_openai.return_value = mock_client_instance
-
-                # Create a conversation
-                create_response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Test message for deletion"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert create_response.status_code == 200
-                create_data = create_response.json()
-                conversation_id = create_data["conversation_id"]
-
-                # Verify conversation exists
-                get_response = client.get(
-                    f"/api/{sample_user_id}/conversations/{conversation_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert get_response.status_code == 200
-
-                # Delete the conversation
-                delete_response = client.delete(
-                    f"/api/{sample_user_id}/conversations/{conversation_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert delete_response.status_code == 200
-                assert delete_response.json()["success"] is True
-
-                # Verify conversation is no longer accessible
-                get_deleted_response = client.get(
-                    f"/api/{sample_user_id}/conversations/{conversation_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert get_deleted_response.status_code in [404, 400]  # Should not be found
-
-    def test_database_models_store_conversation_data_correctly(self, sample_user_id):
+                assert "response" in data
+                if conversation_id is None:
+                    assert "conversation_id" in data
+                    conversation_id = data["conversation_id"]
+
+            await scenario.verify(client, sample_user_id, conversation_id)
+
+    # Pin the DB-backed test to one xdist worker under --dist=loadgroup; the
+    # mocked HTTP scenarios above stay freely distributable. The in-memory
+    # engine is per-process anyway, so workers never share a database.
+    @pytest.mark.xdist_group("db")
+    def test_database_models_store_conversation_data_correctly(self, memory_session, sample_user_id):
         """Test that conversation data is correctly stored in the database models."""
-        from backend.database import get_session
-        from sqlmodel import Session
-
-        with next(get_session()) as session:
-            # Create a conversation session
-            session_obj = AgentSession(
-                user_id=sample_user_id,
-                title="Test Conversation"
-            )
-            session.add(session_obj)
-            session.commit()
-            session.refresh(session_obj)
-
-            assert session_obj.user_id == sample_user_id
-            assert session_obj.title == "Test Conversation"
-
-            # Add messages to the conversation
-            user_message = AgentMessage(
-                session_id=session_obj.id,
-                role="user",
-                content="Hello, test message",
-                timestamp=None
-            )
-            session.add(user_message)
-
-            ai_message = AgentMessage(
-                session_id=session_obj.id,
-                role="assistant",
-                content="Hi, this is the AI response",
-                timestamp=None
-            )
-            session.add(ai_message)
-
-            session.commit()
-
-            # Verify messages were saved correctly
-            user_msg_query = select(AgentMessage).where(
-                AgentMessage.session_id == session_obj.id,
-                AgentMessage.role == "user"
-            )
-            user_msgs = session.exec(user_msg_query).all()
-
-            ai_msg_query = select(AgentMessage).where(
-                AgentMessage.session_id == session_obj.id,
-                AgentMessage.role == "assistant"
-            )
-            ai_msgs = session.exec(ai_msg_query).all()
-
-            assert len(user_msgs) == 1
-            assert len(ai_msgs) == 1
-            assert user_msgs[0].content == "Hello, test message"
-            assert ai_msgs[0].content == "Hi, this is the AI response"
-
-            # Verify user context is properly linked
-            user_context = UserContext(
-                user_id=sample_user_id,
-                preferences={},
-                last_interaction=None
-            )
-            session.add(user_context)
-            session.commit()
+        session = memory_session
+        # Create a conversation session; flush (not commit) populates the
+        # generated id while keeping everything in one transaction
+        session_obj = AgentSession(
+            user_id=sample_user_id,
+            title="Test Conversation"
+        )
+        session.add(session_obj)
+        session.flush()
+
+        assert session_obj.user_id == sample_user_id
+        assert session_obj.title == "Test Conversation"
+
+        # Add the messages and the linked user context in one batch
+        user_message = AgentMessage(
+            session_id=session_obj.id,
+            user_id=sample_user_id,
+            role="user",
+            content="Hello, test message",
+            timestamp=FROZEN_NOW
+        )
+        ai_message = AgentMessage(
+            session_id=session_obj.id,
+            user_id=sample_user_id,
+            role="assistant",
+            content="Hi, this is the AI response",
+            timestamp=FROZEN_NOW
+        )
+        user_context = UserContext(
+            user_id=sample_user_id,
+            preferences={},
+            last_interaction=FROZEN_NOW
+        )
+        session.add_all([user_message, ai_message, user_context])
+        session.commit()
+
+        # Verify messages were saved correctly: one query for the session's
+        # messages, partitioned by role in Python instead of a query per role
+        all_msgs = session.exec(
+            select(AgentMessage).where(AgentMessage.session_id == session_obj.id)
+        ).all()
+        user_msgs = [m for m in all_msgs if m.role == "user"]
+        ai_msgs = [m for m in all_msgs if m.role == "assistant"]
+
+        assert len(user_msgs) == 1
+        assert len(ai_msgs) == 1
+        assert user_msgs[0].content == "Hello, test message"
+        assert ai_msgs[0].content == "Hi, this is the AI response"
 
 
 if __name__ == "__main__":
-    pytest.main([__file__])
\ No newline at end of file
+    pytest.main([__file__])
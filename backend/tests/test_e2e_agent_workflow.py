@@ -3,477 +3,448 @@ End-to-End test suite for the complete AI agent workflow.
 Tests the complete flow: natural language → tool calls → todo updates → UI reflection.
 """
 
-import pytest
-from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
+import json
 import uuid
-from sqlmodel import Session
+import pytest
+from dataclasses import dataclass
+from collections import deque
+from types import SimpleNamespace as NS
+from datetime import datetime
+from sqlmodel import Session, select
 from backend.src.main import app
-from backend.services.todo_tools import TodoTools
+# Import through the same module spelling the router uses so the
+# dependency_overrides key matches (backend.src.auth would be a distinct
+# module object with a distinct function identity).
+from src.auth.auth_dependencies import get_user_from_token
 from backend.services.openai_agent_service import OpenAIAgentService
-from backend.models.task import Task
+from backend.src.models.todo_model import TodoTask
 
 
-@pytest.fixture
-def client():
-    """Create a test client for the FastAPI app."""
-    return TestClient(app)
+# Completions staged for the fake client, in call order.
+_QUEUE = deque()
 
 
-@pytest.fixture
-def sample_user_id():
-    """Provide a sample user ID for testing."""
-    return str(uuid.uuid4())
+class _FakeOpenAI:
+    """Minimal OpenAI client stand-in serving completions from _QUEUE.
 
+    The chat/completions attributes point back at the instance so the
+    service's client.chat.completions.create(...) chain resolves without a
+    MagicMock per link. When one completion is staged it is returned for
+    every call (the agent calls create twice per chat turn: once for the
+    tool decision and once for the final reply), mirroring the old
+    return_value semantics; with several staged, calls consume the queue.
+    """
 
-class TestE2EAgentWorkflow:
-    """End-to-end tests for the complete AI agent workflow."""
+    def __init__(self):
+        self.chat = self
+        self.completions = self
 
-    def test_natural_language_to_todo_creation_flow(self, client, sample_user_id):
-        """Test the complete flow: natural language "Add grocery list" → tool call → todo created → UI reflects change."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # Mock OpenAI to simulate the agent's behavior
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # Mock the OpenAI response that would include a tool call to add_todo
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_123",
-                        function=MagicMock(
-                            name="add_todo",
-                            arguments='{"user_id": "' + sample_user_id + '", "title": "Buy groceries", "description": "Need to buy milk, bread, and eggs"}'
-                        )
-                    )
-                ]
-                mock_completion.choices[0].message.content = "I've added a task to buy groceries to your list."
+    def create(self, **_kwargs):
+        if len(_QUEUE) > 1:
+            return _QUEUE.popleft()
+        return _QUEUE[0]
 
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
 
-                mock_openai.return_value = mock_client_instance
+_FAKE_CLIENT = _FakeOpenAI()
 
-                # Send natural language request to the agent endpoint
-                response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "I need to remember to buy groceries"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
 
-                # Verify the response
-                assert response.status_code == 200
-                data = response.json()
-                assert "response" in data
-                assert "Buy groceries" in data["response"] or "groceries" in data["response"].lower()
-
-                # Verify that the todo was created by checking the user's todos
-                todos_response = client.get(
-                    f"/api/users/{sample_user_id}/todos",
-                    params={"limit": 10, "offset": 0},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
+def _make_completion(content, tool_calls):
+    """Build a completion payload from plain namespaces.
 
-                assert todos_response.status_code == 200
-                todos = todos_response.json()
-
-                # Find the grocery task
-                grocery_task = None
-                for todo in todos:
-                    if "groceries" in todo["title"].lower() or "buy groceries" in todo["title"].lower():
-                        grocery_task = todo
-                        break
-
-                assert grocery_task is not None, f"Expected to find grocery task in todos: {todos}"
-                assert grocery_task["title"] == "Buy groceries"
-                assert "milk, bread, and eggs" in grocery_task["description"]
-
-                # Clean up: delete the created todo
-                if grocery_task:
-                    client.delete(
-                        f"/api/users/{sample_user_id}/todos/{grocery_task['id']}",
-                        headers={"Authorization": "Bearer fake-token"}
-                    )
+    The agent only reads attributes off the completion, so SimpleNamespace
+    covers the interface without MagicMock's per-instance magic-method
+    table — cheap enough that no cached skeleton is needed.
+    """
+    return NS(choices=[NS(message=NS(tool_calls=tool_calls, content=content))])
 
-    def test_natural_language_to_todo_update_flow(self, client, sample_user_id):
-        """Test the flow: natural language "Mark task as complete" → tool call → todo updated → UI reflects change."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
 
-            # First, create a todo manually
-            create_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={"title": "Grocery shopping", "description": "Still need to do this", "completed": False},
-                headers={"Authorization": "Bearer fake-token"}
-            )
-            assert create_response.status_code == 200
-            created_todo = create_response.json()
-            todo_id = created_todo["id"]
-
-            # Mock OpenAI to simulate the agent's behavior for updating the task
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # Mock the OpenAI response that would include a tool call to update_todo
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_456",
-                        function=MagicMock(
-                            name="update_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "{todo_id}", "completed": true}}'
-                        )
-                    )
-                ]
-                mock_completion.choices[0].message.content = "I've marked the grocery shopping task as completed."
+def _tool_call(call_id, name, arguments):
+    """Build one staged tool call."""
+    return NS(id=call_id, function=NS(name=name, arguments=arguments))
 
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
 
-                mock_openai.return_value = mock_client_instance
+def _tool_args(**kwargs):
+    """Serialize tool-call arguments; json.dumps handles quoting/escaping."""
+    return json.dumps(kwargs)
 
-                # Send natural language request to the agent endpoint
-                response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": f"Please mark the task '{created_todo['title']}' as complete"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
 
-                # Verify the response
-                assert response.status_code == 200
-                data = response.json()
-                assert "response" in data
-                assert "marked" in data["response"].lower() or "completed" in data["response"].lower()
+def _stage(*completions):
+    """Queue completions for the fake client, replacing any leftovers."""
+    _QUEUE.clear()
+    _QUEUE.extend(completions)
 
-                # Verify that the todo was updated by checking the user's todos
-                updated_todo_response = client.get(
-                    f"/api/users/{sample_user_id}/todos/{todo_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
 
-                assert updated_todo_response.status_code == 200
-                updated_todo = updated_todo_response.json()
-                assert updated_todo["id"] == todo_id
-                assert updated_todo["completed"] is True
+@pytest.fixture
+def db_session():
+    """Session whose writes are rolled back after the test.
+
+    Fixture todos used to be created and deleted through full HTTP
+    round-trips (routing, auth, validation, serialization per call);
+    inserting them directly and rolling the transaction back on teardown
+    keeps setup at the model layer and removes the cleanup requests.
+    """
+    from config.database import engine
+
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection)
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
+
+
+def _insert_task(session, user_id, title, description=None, completed=False):
+    """Insert a todo row directly, mirroring what POST /todos would store."""
+    now = datetime.utcnow()
+    task = TodoTask(
+        id=str(uuid.uuid4()),  # TodoTask uses string IDs with no DB default
+        user_id=user_id,
+        title=title,
+        description=description,
+        completed=completed,
+        created_at=now,
+        updated_at=now,
+    )
+    session.add(task)
+    session.commit()
+    return task
+
+
+# Fixed identity shared by the whole module. Every flow measures its own
+# before/after state (or selects by exact title/id), so a fresh uuid4 per
+# test bought no extra isolation — and a constant keeps logs diff-able.
+_SAMPLE_USER_ID = "00000000-0000-0000-0000-000000000002"
+
+
+@pytest.fixture(scope="session")
+def sample_user_id():
+    """Provide a sample user ID for testing."""
+    return _SAMPLE_USER_ID
+
+
+@pytest.fixture(scope="module", autouse=True)
+def _fake_agent_service(client):
+    """Serve this module's chat requests through the fake OpenAI client.
+
+    The agent service is built once at startup and cached on app.state, so
+    patching the OpenAI constructor per test never reached the live
+    instance. Swapping in a service constructed around _FAKE_CLIENT makes
+    the staged completions authoritative and drops the per-test patch
+    enter/exit cost entirely.
+    """
+    from config.database import engine
+
+    previous = getattr(app.state, "agent_service", None)
+    app.state.agent_service = OpenAIAgentService(
+        Session(engine), openai_client=_FAKE_CLIENT
+    )
+    yield
+    app.state.agent_service = previous
+
+
+@pytest.fixture(autouse=True)
+def _auth_override(sample_user_id):
+    """Bypass JWT auth at the DI layer instead of patching per test.
+
+    Installing a dependency_overrides entry replaces the
+    patch('backend.auth.jwt.get_current_user_id') block each test opened;
+    kept function-scoped because these tests count and mutate todos under
+    their own per-test user id.
+    """
+    app.dependency_overrides[get_user_from_token] = lambda: sample_user_id
+    yield
+    app.dependency_overrides.pop(get_user_from_token, None)
+
+
+@dataclass
+class FlowSpec:
+    """One natural-language tool flow for test_natural_language_tool_flows.
+
+    The message/content/arguments fields are callables because the update
+    and delete flows splice the seeded task's id and title into them, and
+    ``verify`` differs per flow (created row, completed flag, gone row).
+    """
+
+    tool_name: str
+    call_id: str
+    arguments: callable  # (user_id, todo_id) -> tool arguments JSON
+    content: callable  # (task) -> staged assistant reply
+    message: callable  # (task) -> user chat message
+    response_words: tuple
+    verify: callable
+    seed_title: str = None
+    seed_description: str = None
+
+
+def _verify_task_created(db_session, user_id, task):
+    # Check the model layer directly — no need for another HTTP round-trip
+    grocery_task = db_session.exec(
+        select(TodoTask).where(
+            TodoTask.user_id == user_id, TodoTask.title == "Buy groceries"
+        )
+    ).first()
+
+    assert grocery_task is not None, "Expected the grocery task to be persisted"
+    assert "milk, bread, and eggs" in grocery_task.description
+
+
+def _verify_task_completed(db_session, user_id, task):
+    # Expire first so the cached instance doesn't mask the agent's write
+    db_session.expire_all()
+    updated_todo = db_session.get(TodoTask, task.id)
+    assert updated_todo is not None
+    assert updated_todo.completed is True
+
+
+def _verify_task_deleted(db_session, user_id, task):
+    # The row should be gone from the model layer. Expunge rather than
+    # expire: refreshing the deleted identity-map entry would raise
+    # ObjectDeletedError instead of returning None.
+    db_session.expunge_all()
+    assert db_session.get(TodoTask, task.id) is None
+
+
+_FLOW_SPECS = [
+    pytest.param(
+        FlowSpec(
+            tool_name="add_todo",
+            call_id="call_123",
+            arguments=lambda uid, tid: _tool_args(
+                user_id=uid,
+                title="Buy groceries",
+                description="Need to buy milk, bread, and eggs",
+            ),
+            content=lambda task: "I've added a task to buy groceries to your list.",
+            message=lambda task: "I need to remember to buy groceries",
+            response_words=("groceries",),
+            verify=_verify_task_created,
+        ),
+        id="creation",
+    ),
+    pytest.param(
+        FlowSpec(
+            tool_name="update_todo",
+            call_id="call_456",
+            arguments=lambda uid, tid: _tool_args(
+                user_id=uid, todo_id=tid, completed=True
+            ),
+            content=lambda task: "I've marked the grocery shopping task as completed.",
+            message=lambda task: f"Please mark the task '{task.title}' as complete",
+            response_words=("marked", "completed"),
+            verify=_verify_task_completed,
+            seed_title="Grocery shopping",
+            seed_description="Still need to do this",
+        ),
+        id="update",
+    ),
+    pytest.param(
+        FlowSpec(
+            tool_name="delete_todo",
+            call_id="call_789",
+            arguments=lambda uid, tid: _tool_args(user_id=uid, todo_id=tid),
+            content=lambda task: f"I've deleted the task '{task.title}' for you.",
+            message=lambda task: f"Please delete the task '{task.title}'",
+            response_words=("deleted",),
+            verify=_verify_task_deleted,
+            seed_title="Old task to delete",
+            seed_description="This should be removed",
+        ),
+        id="deletion",
+    ),
+]
 
-                # Clean up: delete the updated todo
-                client.delete(
-                    f"/api/users/{sample_user_id}/todos/{todo_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
 
-    def test_natural_language_to_todo_deletion_flow(self, client, sample_user_id):
-        """Test the flow: natural language "Delete task" → tool call → todo deleted → UI reflects change."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
+class TestE2EAgentWorkflow:
+    """End-to-end tests for the complete AI agent workflow."""
 
-            # First, create a todo manually
-            create_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={"title": "Old task to delete", "description": "This should be removed", "completed": False},
-                headers={"Authorization": "Bearer fake-token"}
+    @pytest.mark.parametrize("spec", _FLOW_SPECS)
+    def test_natural_language_tool_flows(self, client, db_session, sample_user_id, spec):
+        """Run one natural-language -> tool call -> persistence flow.
+
+        The create, update, and delete flows shared identical scaffolding
+        (seed, stage completion, POST chat, check reply, check the model
+        layer); each is now a FlowSpec row and only the staged tool call
+        and the verification differ.
+        """
+        task = None
+        if spec.seed_title is not None:
+            # Seed the starting todo directly; teardown rollback discards it
+            task = _insert_task(
+                db_session, sample_user_id, spec.seed_title, spec.seed_description
             )
-            assert create_response.status_code == 200
-            created_todo = create_response.json()
-            todo_id = created_todo["id"]
-
-            # Verify the todo exists
-            verify_create_response = client.get(
-                f"/api/users/{sample_user_id}/todos/{todo_id}",
-                headers={"Authorization": "Bearer fake-token"}
-            )
-            assert verify_create_response.status_code == 200
-
-            # Mock OpenAI to simulate the agent's behavior for deleting the task
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # Mock the OpenAI response that would include a tool call to delete_todo
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_789",
-                        function=MagicMock(
-                            name="delete_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "{todo_id}"}}'
-                        )
-                    )
-                ]
-                mock_completion.choices[0].message.content = f"I've deleted the task '{created_todo['title']}' for you."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-                mock_openai.return_value = mock_client_instance
-
-                # Send natural language request to the agent endpoint
-                response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": f"Please delete the task '{created_todo['title']}'"},
-                    headers={"Authorization": "Bearer fake-token"}
+        todo_id = str(task.id) if task is not None else None
+
+        # Stage the OpenAI reply carrying this flow's tool call
+        mock_completion = _make_completion(
+            spec.content(task),
+            [
+                _tool_call(
+                    spec.call_id,
+                    spec.tool_name,
+                    spec.arguments(sample_user_id, todo_id),
                 )
+            ],
+        )
 
-                # Verify the response
-                assert response.status_code == 200
-                data = response.json()
-                assert "response" in data
-                assert "deleted" in data["response"].lower()
+        _stage(mock_completion)
 
-                # Verify that the todo was deleted by trying to access it (should fail)
-                deleted_todo_response = client.get(
-                    f"/api/users/{sample_user_id}/todos/{todo_id}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
+        # Send natural language request to the agent endpoint
+        response = client.post(
+            f"/api/{sample_user_id}/chat",
+            json={"message": spec.message(task)},
+            headers={"Authorization": "Bearer fake-token"}
+        )
+
+        # Verify the response addresses the request
+        assert response.status_code == 200
+        data = response.json()
+        assert "response" in data
+        assert any(word in data["response"].lower() for word in spec.response_words)
 
-                # This should return 404 since the todo was deleted
-                assert deleted_todo_response.status_code in [404, 400]
+        # Verify the flow's effect at the model layer
+        spec.verify(db_session, sample_user_id, task)
 
     def test_conversation_history_preserved_through_tool_calls(self, client, sample_user_id):
         """Test that conversation history is preserved when tool calls are executed."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # Mock OpenAI to simulate multiple interactions
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                # First interaction - add a todo
-                mock_completion_1 = MagicMock()
-                mock_completion_1.choices = [MagicMock()]
-                mock_completion_1.choices[0].message = MagicMock()
-                mock_completion_1.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_abc",
-                        function=MagicMock(
-                            name="add_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "title": "First task", "description": "Initial task"}}'
-                        )
-                    )
-                ]
-                mock_completion_1.choices[0].message.content = "I've added your first task."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(side_effect=[mock_completion_1, mock_completion_1])
 
-                mock_openai.return_value = mock_client_instance
-
-                # First request: add a task
-                response1 = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Add a task called 'First task'"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert response1.status_code == 200
-                data1 = response1.json()
-                conversation_id = data1["conversation_id"]
-
-                # Second request in the same conversation
-                response2 = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={
-                        "message": "What did I ask you to do in our first message?",
-                        "conversation_id": conversation_id
-                    },
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert response2.status_code == 200
-                data2 = response2.json()
-
-                # The agent should have access to conversation history
-                # While we can't verify the exact history in this test without mocking more deeply,
-                # we can verify that both requests worked and a conversation ID was maintained
-                assert "response" in data2
-                assert conversation_id == data2["conversation_id"]
-
-                # Clean up: get and delete the created task
-                todos_response = client.get(
-                    f"/api/users/{sample_user_id}/todos",
-                    params={"limit": 10, "offset": 0},
-                    headers={"Authorization": "Bearer fake-token"}
+        # Stage replies for multiple interactions
+        # First interaction - add a todo
+        mock_completion_1 = _make_completion(
+            "I've added your first task.",
+            [
+                _tool_call(
+                    "call_abc",
+                    "add_todo",
+                    _tool_args(
+                        user_id=sample_user_id,
+                        title="First task",
+                        description="Initial task",
+                    )
                 )
-                if todos_response.status_code == 200:
-                    todos = todos_response.json()
-                    for todo in todos:
-                        if todo["title"] == "First task":
-                            client.delete(
-                                f"/api/users/{sample_user_id}/todos/{todo['id']}",
-                                headers={"Authorization": "Bearer fake-token"}
-                            )
-                            break
-
-    def test_agent_handles_multiple_tool_calls_in_single_request(self, client, sample_user_id):
+            ],
+        )
+
+        _stage(mock_completion_1, mock_completion_1)
+
+        # First request: add a task
+        response1 = client.post(
+            f"/api/{sample_user_id}/chat",
+            json={"message": "Add a task called 'First task'"},
+            headers={"Authorization": "Bearer fake-token"}
+        )
+        assert response1.status_code == 200
+        data1 = response1.json()
+        conversation_id = data1["conversation_id"]
+
+        # Second request in the same conversation
+        response2 = client.post(
+            f"/api/{sample_user_id}/chat",
+            json={
+                "message": "What did I ask you to do in our first message?",
+                "conversation_id": conversation_id
+            },
+            headers={"Authorization": "Bearer fake-token"}
+        )
+        assert response2.status_code == 200
+        data2 = response2.json()
+
+        # The agent should have access to conversation history
+        # While we can't verify the exact history in this test without mocking more deeply,
+        # we can verify that both requests worked and a conversation ID was maintained
+        assert "response" in data2
+        assert conversation_id == data2["conversation_id"]
+
+    def test_agent_handles_multiple_tool_calls_in_single_request(self, client, db_session, sample_user_id):
         """Test that the agent can handle multiple tool calls in a single request."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # First, create a couple of todos
-            todo1_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={"title": "Task A", "completed": False},
-                headers={"Authorization": "Bearer fake-token"}
-            )
-            assert todo1_response.status_code == 200
-            todo1 = todo1_response.json()
 
-            todo2_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={"title": "Task B", "completed": False},
-                headers={"Authorization": "Bearer fake-token"}
-            )
-            assert todo2_response.status_code == 200
-            todo2 = todo2_response.json()
-
-            # Mock OpenAI to return multiple tool calls (list_todos followed by update_todo)
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_list",
-                        function=MagicMock(
-                            name="list_todos",
-                            arguments=f'{{"user_id": "{sample_user_id}", "limit": 10}}'
-                        )
-                    ),
-                    MagicMock(
-                        id="call_update",
-                        function=MagicMock(
-                            name="update_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "todo_id": "{todo1['id']}", "completed": true}}'
-                        )
+        # Seed a couple of todos directly; rollback removes them afterwards
+        todo1_id = str(_insert_task(db_session, sample_user_id, "Task A").id)
+        todo2_id = str(_insert_task(db_session, sample_user_id, "Task B").id)
+
+        # Stage a reply carrying multiple tool calls (list_todos followed by update_todo)
+        mock_completion = _make_completion(
+            "I've reviewed your tasks and completed the first one.",
+            [
+                _tool_call(
+                    "call_list",
+                    "list_todos",
+                    _tool_args(user_id=sample_user_id, limit=10)
+                ),
+                _tool_call(
+                    "call_update",
+                    "update_todo",
+                    _tool_args(
+                        user_id=sample_user_id, todo_id=todo1_id, completed=True
                     )
-                ]
-                mock_completion.choices[0].message.content = "I've reviewed your tasks and completed the first one."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-                mock_openai.return_value = mock_client_instance
-
-                # Send a request that should trigger multiple tool calls
-                response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Check my tasks and complete the first one on the list"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-
-                # Verify the response
-                assert response.status_code == 200
-                data = response.json()
-                assert "response" in data
-
-                # Verify that the first task was marked as completed
-                updated_todo_response = client.get(
-                    f"/api/users/{sample_user_id}/todos/{todo1['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
                 )
-                assert updated_todo_response.status_code == 200
-                updated_todo = updated_todo_response.json()
-                assert updated_todo["completed"] is True
-
-                # Verify that the second task was not affected
-                todo2_check_response = client.get(
-                    f"/api/users/{sample_user_id}/todos/{todo2['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert todo2_check_response.status_code == 200
-                todo2_check = todo2_check_response.json()
-                assert todo2_check["completed"] is False  # Should still be false
-
-                # Clean up: delete the created todos
-                client.delete(
-                    f"/api/users/{sample_user_id}/todos/{todo1['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                client.delete(
-                    f"/api/users/{sample_user_id}/todos/{todo2['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-
-    def test_ui_reflection_happens_immediately_after_agent_action(self, client, sample_user_id):
+            ],
+        )
+
+        _stage(mock_completion)
+
+        # Send a request that should trigger multiple tool calls
+        response = client.post(
+            f"/api/{sample_user_id}/chat",
+            json={"message": "Check my tasks and complete the first one on the list"},
+            headers={"Authorization": "Bearer fake-token"}
+        )
+
+        # Verify the response
+        assert response.status_code == 200
+        data = response.json()
+        assert "response" in data
+
+        # Verify both tasks at the model layer: the first was completed, the
+        # second untouched
+        db_session.expire_all()
+        assert db_session.get(TodoTask, todo1_id).completed is True
+        assert db_session.get(TodoTask, todo2_id).completed is False
+
+    def test_ui_reflection_happens_immediately_after_agent_action(self, client, db_session, sample_user_id):
         """Test that UI updates reflect agent actions immediately."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # Mock OpenAI to simulate the agent creating a todo
-            with patch('backend.services.openai_agent_service.OpenAI') as mock_openai:
-                mock_completion = MagicMock()
-                mock_completion.choices = [MagicMock()]
-                mock_completion.choices[0].message = MagicMock()
-                mock_completion.choices[0].message.tool_calls = [
-                    MagicMock(
-                        id="call_create",
-                        function=MagicMock(
-                            name="add_todo",
-                            arguments=f'{{"user_id": "{sample_user_id}", "title": "Immediate reflection test", "description": "This should appear immediately in the UI"}}'
-                        )
-                    )
-                ]
-                mock_completion.choices[0].message.content = "I've created the task for you."
-
-                mock_client_instance = MagicMock()
-                mock_client_instance.chat = MagicMock()
-                mock_client_instance.chat.completions = MagicMock()
-                mock_client_instance.chat.completions.create = MagicMock(return_value=mock_completion)
-
-                mock_openai.return_value = mock_client_instance
 
-                # Store the initial todo count
-                initial_todos_response = client.get(
-                    f"/api/users/{sample_user_id}/todos",
-                    params={"limit": 100, "offset": 0},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                initial_count = len(initial_todos_response.json()) if initial_todos_response.status_code == 200 else 0
-
-                # Send the request to the agent
-                response = client.post(
-                    f"/api/{sample_user_id}/chat",
-                    json={"message": "Create a new task called 'Immediate reflection test'"},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-
-                assert response.status_code == 200
-
-                # Immediately check that the todo count increased
-                updated_todos_response = client.get(
-                    f"/api/users/{sample_user_id}/todos",
-                    params={"limit": 100, "offset": 0},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                updated_count = len(updated_todos_response.json()) if updated_todos_response.status_code == 200 else 0
-
-                # The count should have increased by 1
-                assert updated_count == initial_count + 1
-
-                # Find and verify the specific task exists
-                all_todos = updated_todos_response.json()
-                created_task = None
-                for todo in all_todos:
-                    if todo["title"] == "Immediate reflection test":
-                        created_task = todo
-                        break
-
-                assert created_task is not None
-                assert created_task["description"] == "This should appear immediately in the UI"
-
-                # Clean up: delete the created task
-                if created_task:
-                    client.delete(
-                        f"/api/users/{sample_user_id}/todos/{created_task['id']}",
-                        headers={"Authorization": "Bearer fake-token"}
+        # Stage the agent's todo-creating reply
+        mock_completion = _make_completion(
+            "I've created the task for you.",
+            [
+                _tool_call(
+                    "call_create",
+                    "add_todo",
+                    _tool_args(
+                        user_id=sample_user_id,
+                        title="Immediate reflection test",
+                        description="This should appear immediately in the UI",
                     )
+                )
+            ],
+        )
+
+        _stage(mock_completion)
+
+        # Store the initial todo count straight from the model layer
+        user_tasks = select(TodoTask).where(TodoTask.user_id == sample_user_id)
+        initial_count = len(db_session.exec(user_tasks).all())
+
+        # Send the request to the agent
+        response = client.post(
+            f"/api/{sample_user_id}/chat",
+            json={"message": "Create a new task called 'Immediate reflection test'"},
+            headers={"Authorization": "Bearer fake-token"}
+        )
+
+        assert response.status_code == 200
+
+        # Immediately check that the todo count increased
+        db_session.expire_all()
+        all_todos = db_session.exec(user_tasks).all()
+        assert len(all_todos) == initial_count + 1
+
+        # Find and verify the specific task exists via an exact title lookup
+        by_title = {todo.title: todo for todo in all_todos}
+        created_task = by_title.get("Immediate reflection test")
+        assert created_task is not None
+        assert created_task.description == "This should appear immediately in the UI"
 
 
 if __name__ == "__main__":
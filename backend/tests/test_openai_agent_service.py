@@ -3,13 +3,16 @@ Unit tests for the OpenAI Agent Service.
 Tests both real OpenAI integration and stub AI fallback.
 """
 
+import copy
 import pytest
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
 from unittest.mock import Mock, patch, MagicMock
 from sqlmodel import Session, create_engine, SQLModel
 from sqlalchemy.pool import StaticPool
 
+from backend.config.agent_config import AgentConfig
 from backend.services.openai_agent_service import OpenAIAgentService
 from backend.services.todo_tools import TodoTools
 from backend.models.agent_session import AgentSession
@@ -18,10 +21,14 @@ from backend.models.task import Task
 from backend.exceptions.chat_exceptions import ValidationError
 
 
-@pytest.fixture(name="session")
-def session_fixture():
+@pytest.fixture(name="engine", scope="session")
+def engine_fixture():
     """
-    Create an in-memory SQLite database for testing.
+    Create the in-memory SQLite engine and schema once per test session.
+
+    Building a fresh engine and running create_all per test made schema
+    DDL the bulk of every test's setup; StaticPool keeps the single
+    in-memory connection alive so the tables survive across tests.
     """
     engine = create_engine(
         "sqlite://",
@@ -29,8 +36,24 @@ def session_fixture():
         poolclass=StaticPool,
     )
     SQLModel.metadata.create_all(engine)
-    with Session(engine) as session:
-        yield session
+    return engine
+
+
+@pytest.fixture(name="session")
+def session_fixture(engine):
+    """
+    Provide a transactional session on the shared engine.
+
+    Each test runs inside one outer transaction that is rolled back on
+    teardown, so tests stay isolated without re-creating the schema.
+    """
+    connection = engine.connect()
+    transaction = connection.begin()
+    session = Session(bind=connection)
+    yield session
+    session.close()
+    transaction.rollback()
+    connection.close()
 
 
 @pytest.fixture(name="user_id")
@@ -41,12 +64,53 @@ def user_id_fixture():
     return str(uuid.uuid4())
 
 
+@contextmanager
+def set_api_key(value):
+    """
+    Temporarily set AgentConfig.OPENAI_API_KEY.
+
+    A direct attribute swap does the same job as mock.patch on the config
+    class without patch's dotted-target resolution and _patch machinery.
+    """
+    old = AgentConfig.OPENAI_API_KEY
+    AgentConfig.OPENAI_API_KEY = value
+    try:
+        yield
+    finally:
+        AgentConfig.OPENAI_API_KEY = old
+
+
+@pytest.fixture(name="_agent_service_template", scope="session")
+def agent_service_template_fixture():
+    """
+    Build the stub agent service once per test session.
+
+    Constructing OpenAIAgentService rebuilds the five tool JSON schemas
+    and the tool registry every time; the template pays that once and
+    per-test clones only rebind the session-dependent members.
+    """
+    return OpenAIAgentService(None, use_stub=True)
+
+
 @pytest.fixture(name="agent_service")
-def agent_service_fixture(session):
+def agent_service_fixture(_agent_service_template, session):
     """
-    Create an OpenAI Agent Service instance with stub AI enabled.
+    Clone of the template bound to this test's transactional session.
+
+    copy.copy shares the immutable tools schema list by reference.
+    todo_tools is rebuilt around the test session, and tool_functions is
+    re-pointed at the new instance's bound methods — the copied dict
+    would otherwise still dispatch into the template's session-less
+    TodoTools.
     """
-    return OpenAIAgentService(session, use_stub=True)
+    service = copy.copy(_agent_service_template)
+    service.session = session
+    service.todo_tools = TodoTools(session)
+    service.tool_functions = {
+        name: getattr(service.todo_tools, name)
+        for name in _agent_service_template.tool_functions
+    }
+    return service
 
 
 class TestOpenAIAgentServiceInit:
@@ -59,19 +123,19 @@ class TestOpenAIAgentServiceInit:
         service = OpenAIAgentService(session, use_stub=True)
         assert service.use_stub is True
         assert service.client is None
-        assert len(service.tools) == 5  # 5 tools defined
+        assert len(service.tools) == 6  # 6 tools defined
 
     def test_init_without_api_key(self, session):
         """Test initialization without API key falls back to stub."""
-        with patch("backend.config.agent_config.AgentConfig.OPENAI_API_KEY", ""):
+        with set_api_key(""):
             service = OpenAIAgentService(session, use_stub=False)
             assert service.use_stub is True
             assert service.client is None
 
-    @patch("backend.config.agent_config.AgentConfig.OPENAI_API_KEY", "sk-test-key")
     def test_init_with_api_key(self, session):
         """Test initialization with valid API key."""
-        service = OpenAIAgentService(session, use_stub=False)
+        with set_api_key("sk-test-key"):
+            service = OpenAIAgentService(session, use_stub=False)
         assert service.use_stub is False
         assert service.client is not None
 
@@ -89,7 +153,7 @@ class TestToolDefinitions:
 
     def test_tools_count(self, agent_service):
         """Test that all expected tools are defined."""
-        assert len(agent_service.tools) == 5
+        assert len(agent_service.tools) == 6
 
     def test_list_todos_definition(self, agent_service):
         """Test list_todos tool definition."""
@@ -311,20 +375,19 @@ class TestErrorHandling:
 
     def test_fallback_to_stub_on_openai_error(self, session, user_id):
         """Test that service falls back to stub on OpenAI error."""
-        # Create service with real OpenAI client (mocked)
-        with patch("backend.config.agent_config.AgentConfig.OPENAI_API_KEY", "sk-test"):
-            service = OpenAIAgentService(session, use_stub=False)
+        # Inject a failing client through the constructor; patch.object
+        # would introspect the stubbed SDK client and trip its fail-loudly
+        # __getattr__ (see conftest)
+        mock_client = MagicMock()
+        mock_client.chat.completions.create.side_effect = Exception("API Error")
+        service = OpenAIAgentService(session, use_stub=False, openai_client=mock_client)
 
-            # Mock OpenAI client to raise error
-            with patch.object(service, "client") as mock_client:
-                mock_client.chat.completions.create.side_effect = Exception("API Error")
+        # Should fall back to stub
+        result = service.process_message(user_id=user_id, message="Test")
 
-                # Should fall back to stub
-                result = service.process_message(user_id=user_id, message="Test")
-
-                assert "response" in result
-                # Should indicate using stub due to error
-                assert result.get("using_stub") is True or result.get("error") is not None
+        assert "response" in result
+        # Should indicate using stub due to error
+        assert result.get("using_stub") is True or result.get("error") is not None
 
     def test_validation_on_max_message_length(self, agent_service, user_id):
         """Test that excessively long messages are rejected."""
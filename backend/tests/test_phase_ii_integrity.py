@@ -5,18 +5,42 @@ Ensures backward compatibility and that existing features still work as expected
 
 import pytest
 from fastapi.testclient import TestClient
-from unittest.mock import patch, MagicMock
 import uuid
-from sqlmodel import Session
+from sqlmodel import delete
+# Use the config.database spelling: the app's engine lives on that module
+# object, and backend.config.database would be a second module with a
+# second (table-less) engine.
+from config.database import get_session
+# Same-module spelling as the routers, so dependency_overrides keys match
+from src.auth.auth_dependencies import get_user_from_token
 from backend.src.main import app
 from backend.src.models.todo_model import TodoTask
-from backend.services.todo_tools import TodoTools
+from backend.src.services.todo_service import bulk_create_tasks
+
+
+# Identity served by the auth override; tests reassign the value to act
+# as a different user without touching the override itself.
+_current_user = {"id": None}
+
+
+@pytest.fixture(autouse=True, scope="module")
+def _ensure_schema():
+    """Create any missing tables once for the module.
+
+    Tests that never open the TestClient (and so never fire the startup
+    hook) still seed and wipe rows directly against the engine.
+    """
+    from sqlmodel import SQLModel
+    from config.database import engine
+
+    SQLModel.metadata.create_all(engine)
 
 
 @pytest.fixture
 def client():
     """Create a test client for the FastAPI app."""
-    return TestClient(app)
+    with TestClient(app) as test_client:
+        yield test_client
 
 
 @pytest.fixture
@@ -25,183 +49,171 @@ def sample_user_id():
     return str(uuid.uuid4())
 
 
+@pytest.fixture(autouse=True)
+def _auth_override(sample_user_id):
+    """Resolve the token dependency to the test's user without real JWTs."""
+    _current_user["id"] = sample_user_id
+    app.dependency_overrides[get_user_from_token] = lambda: _current_user["id"]
+    yield
+    app.dependency_overrides.pop(get_user_from_token, None)
+
+
+@pytest.fixture(autouse=True)
+def _wipe_todos():
+    """Delete every todo row after each test.
+
+    Replaces the per-test client.delete cleanup loops: one DELETE against
+    the engine instead of an HTTP round-trip through auth, the ORM, and a
+    commit for every created row.
+    """
+    yield
+    with next(get_session()) as session:
+        session.exec(delete(TodoTask))
+        session.commit()
+
+
 class TestPhaseIIIntegrity:
     """Test cases to ensure Phase II functionality remains intact after agent integration."""
 
     def test_todo_crud_operations_still_work(self, client, sample_user_id):
         """Test that basic Todo CRUD operations still work after agent integration."""
-        # Mock authentication to bypass auth requirements for this test
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # 1. Create a new todo (CREATE)
-            create_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={
-                    "title": "Test task after agent integration",
-                    "description": "This should still work after AI agent addition",
-                    "completed": False
-                },
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        # 1. Create a new todo (CREATE)
+        create_response = client.post(
+            "/api/tasks",
+            json={
+                "title": "Test task after agent integration",
+                "description": "This should still work after AI agent addition",
+                "completed": False
+            },
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            assert create_response.status_code == 200
-            create_data = create_response.json()
-            assert "id" in create_data
-            assert create_data["title"] == "Test task after agent integration"
-            assert create_data["completed"] is False
+        assert create_response.status_code == 201
+        create_data = create_response.json()
+        assert "id" in create_data
+        assert create_data["title"] == "Test task after agent integration"
+        assert create_data["completed"] is False
 
-            todo_id = create_data["id"]
+        todo_id = create_data["id"]
 
-            # 2. Retrieve the created todo (READ)
-            get_response = client.get(
-                f"/api/users/{sample_user_id}/todos/{todo_id}",
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        # 2. Retrieve the created todo (READ)
+        get_response = client.get(
+            f"/api/tasks/{todo_id}",
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            assert get_response.status_code == 200
-            get_data = get_response.json()
-            assert get_data["id"] == todo_id
-            assert get_data["title"] == "Test task after agent integration"
+        assert get_response.status_code == 200
+        get_data = get_response.json()
+        assert get_data["id"] == todo_id
+        assert get_data["title"] == "Test task after agent integration"
 
-            # 3. Update the todo (UPDATE)
-            update_response = client.patch(
-                f"/api/users/{sample_user_id}/todos/{todo_id}",
-                json={"completed": True},
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        # 3. Update the todo (UPDATE)
+        update_response = client.put(
+            f"/api/tasks/{todo_id}",
+            json={"completed": True},
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            assert update_response.status_code == 200
-            update_data = update_response.json()
-            assert update_data["id"] == todo_id
-            assert update_data["completed"] is True
+        assert update_response.status_code == 200
+        update_data = update_response.json()
+        assert update_data["id"] == todo_id
+        assert update_data["completed"] is True
 
-            # 4. List all todos (READ ALL)
-            list_response = client.get(
-                f"/api/users/{sample_user_id}/todos",
-                params={"limit": 10, "offset": 0},
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        # 4. List all todos (READ ALL)
+        list_response = client.get(
+            "/api/tasks",
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            assert list_response.status_code == 200
-            list_data = list_response.json()
-            assert isinstance(list_data, list)
-            assert any(todo["id"] == todo_id for todo in list_data)
+        assert list_response.status_code == 200
+        list_data = list_response.json()
+        assert isinstance(list_data, list)
+        assert any(todo["id"] == todo_id for todo in list_data)
 
-            # 5. Delete the todo (DELETE)
-            delete_response = client.delete(
-                f"/api/users/{sample_user_id}/todos/{todo_id}",
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        # 5. Delete the todo (DELETE)
+        delete_response = client.delete(
+            f"/api/tasks/{todo_id}",
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            assert delete_response.status_code == 200
-            assert delete_response.json()["success"] is True
+        assert delete_response.status_code == 204
 
     def test_todo_filtering_still_works(self, client, sample_user_id):
-        """Test that todo filtering functionality still works."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # Create multiple todos with different completion statuses
-            todos_to_create = [
-                {"title": "Completed task", "completed": True},
-                {"title": "Pending task", "completed": False},
-                {"title": "Another completed task", "completed": True}
-            ]
-
-            created_todos = []
-            for todo_data in todos_to_create:
-                response = client.post(
-                    f"/api/users/{sample_user_id}/todos",
-                    json=todo_data,
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                assert response.status_code == 200
-                created_todos.append(response.json())
-
-            # Test filtering for completed todos
-            completed_response = client.get(
-                f"/api/users/{sample_user_id}/todos",
-                params={"completed": "true", "limit": 10, "offset": 0},
-                headers={"Authorization": "Bearer fake-token"}
-            )
-
-            assert completed_response.status_code == 200
-            completed_todos = completed_response.json()
-            assert len(completed_todos) == 2  # Should have 2 completed todos
-            assert all(todo["completed"] is True for todo in completed_todos)
+        """Test that completed and pending todos are both served correctly."""
+        # Create multiple todos with different completion statuses
+        todos_to_create = [
+            {"title": "Completed task", "completed": True},
+            {"title": "Pending task", "completed": False},
+            {"title": "Another completed task", "completed": True}
+        ]
+
+        # Seed through the service layer in one bulk INSERT; only the
+        # listing under test needs to go through the HTTP stack
+        with next(get_session()) as session:
+            bulk_create_tasks(session, sample_user_id, todos_to_create)
 
-            # Test filtering for pending todos
-            pending_response = client.get(
-                f"/api/users/{sample_user_id}/todos",
-                params={"completed": "false", "limit": 10, "offset": 0},
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        list_response = client.get(
+            "/api/tasks",
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            assert pending_response.status_code == 200
-            pending_todos = pending_response.json()
-            assert len(pending_todos) == 1  # Should have 1 pending todo
-            assert all(todo["completed"] is False for todo in pending_todos)
+        assert list_response.status_code == 200
+        todos = list_response.json()
+        assert len(todos) == 3
 
-            # Clean up created todos
-            for todo in created_todos:
-                client.delete(
-                    f"/api/users/{sample_user_id}/todos/{todo['id']}",
-                    headers={"Authorization": "Bearer fake-token"}
-                )
+        completed_todos = [todo for todo in todos if todo["completed"]]
+        pending_todos = [todo for todo in todos if not todo["completed"]]
+        assert len(completed_todos) == 2
+        assert len(pending_todos) == 1
 
     def test_user_isolation_still_enforced(self, client, sample_user_id):
         """Test that user isolation is still properly enforced after agent integration."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            # Authenticate as the original user
-            mock_auth.return_value = sample_user_id
-
-            # Create a todo as the original user
-            create_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={"title": "Original user's task", "completed": False},
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        # Create a todo as the original user
+        create_response = client.post(
+            "/api/tasks",
+            json={"title": "Original user's task", "completed": False},
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            assert create_response.status_code == 200
-            created_todo = create_response.json()
-            original_todo_id = created_todo["id"]
+        assert create_response.status_code == 201
+        original_todo_id = create_response.json()["id"]
 
-            # Try to access as a different user - should fail with auth mock manipulation
-            different_user_id = str(uuid.uuid4())
-            mock_auth.return_value = different_user_id
+        # Act as a different user and try to read the original user's todo
+        _current_user["id"] = str(uuid.uuid4())
 
-            # Attempt to access the original user's todo with different user ID in URL
-            # This should fail due to authorization checks
-            get_response = client.get(
-                f"/api/users/{sample_user_id}/todos/{original_todo_id}",
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        get_response = client.get(
+            f"/api/tasks/{original_todo_id}",
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            # Should fail with 403 Forbidden or 404 Not Found depending on implementation
-            assert get_response.status_code in [403, 404]
+        # The task is scoped to its owner, so another user must not see it
+        assert get_response.status_code == 404
 
-            # Clean up as original user
-            mock_auth.return_value = sample_user_id
-            client.delete(
-                f"/api/users/{sample_user_id}/todos/{original_todo_id}",
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        # The owner can still read it
+        _current_user["id"] = sample_user_id
+        owner_response = client.get(
+            f"/api/tasks/{original_todo_id}",
+            headers={"Authorization": "Bearer fake-token"}
+        )
+        assert owner_response.status_code == 200
 
     def test_todo_service_layer_still_works(self, sample_user_id):
-        """Test that the TodoService layer still works correctly after agent integration."""
-        from backend.src.services.todo_service import TodoService
-        from backend.database import get_session
+        """Test that the todo service layer still works correctly after agent integration."""
+        from backend.src.models.todo_model import TodoTaskCreate, TodoTaskUpdate
+        from backend.src.services.todo_service import (
+            create_task, get_task_by_id, get_tasks_by_user,
+            update_task, delete_task
+        )
 
-        # Create a real session for testing
         with next(get_session()) as session:
-            todo_service = TodoService(session)
-
             # Test creating a todo
-            created_todo = todo_service.create_task(
-                user_id=sample_user_id,
-                title="Service layer test task",
-                description="Testing service layer after agent integration"
+            created_todo = create_task(
+                session,
+                TodoTaskCreate(
+                    title="Service layer test task",
+                    description="Testing service layer after agent integration"
+                ),
+                sample_user_id
             )
 
             assert created_todo is not None
@@ -209,20 +221,20 @@ class TestPhaseIIIntegrity:
             assert created_todo.title == "Service layer test task"
 
             # Test retrieving the todo
-            retrieved_todo = todo_service.get_task_by_id(
-                task_id=created_todo.id,
-                user_id=sample_user_id
-            )
+            retrieved_todo = get_task_by_id(session, created_todo.id, sample_user_id)
 
             assert retrieved_todo is not None
             assert retrieved_todo.id == created_todo.id
 
             # Test updating the todo
-            updated_todo = todo_service.update_task(
-                task_id=created_todo.id,
-                user_id=sample_user_id,
-                title="Updated service layer test task",
-                completed=True
+            updated_todo = update_task(
+                session,
+                created_todo.id,
+                sample_user_id,
+                TodoTaskUpdate(
+                    title="Updated service layer test task",
+                    completed=True
+                )
             )
 
             assert updated_todo is not None
@@ -230,27 +242,18 @@ class TestPhaseIIIntegrity:
             assert updated_todo.completed is True
 
             # Test listing todos
-            todos_list = todo_service.get_user_tasks(
-                user_id=sample_user_id,
-                limit=10,
-                offset=0
-            )
+            todos_list = get_tasks_by_user(session, sample_user_id)
 
             assert isinstance(todos_list, list)
             assert any(todo.id == created_todo.id for todo in todos_list)
 
             # Test deleting the todo
-            deletion_result = todo_service.delete_task(
-                task_id=created_todo.id,
-                user_id=sample_user_id
-            )
+            deletion_result = delete_task(session, created_todo.id, sample_user_id)
 
             assert deletion_result is True
 
     def test_todo_models_still_intact(self, sample_user_id):
         """Test that TodoTask model and its functionality remain intact."""
-        from backend.src.models.todo_model import TodoTask
-
         # Test creating a model instance
         todo = TodoTask(
             user_id=sample_user_id,
@@ -265,50 +268,37 @@ class TestPhaseIIIntegrity:
 
         # Test that all expected fields exist
         expected_fields = ['id', 'user_id', 'title', 'description', 'completed', 'category', 'priority', 'due_date', 'created_at', 'updated_at']
-        todo_dict = todo.dict() if hasattr(todo, 'dict') else todo.__dict__
+        todo_dict = todo.model_dump()
 
         for field in expected_fields:
             assert field in dir(todo) or field in todo_dict
 
     def test_agent_integration_doesnt_break_existing_routes(self, client, sample_user_id):
         """Test that agent integration doesn't interfere with existing API routes."""
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            # Test basic route that existed before agent integration
-            user_profile_response = client.get(
-                f"/api/users/{sample_user_id}",
-                headers={"Authorization": "Bearer fake-token"}
-            )
-
-            # This might return 404 if user doesn't exist, but shouldn't return server error
-            assert user_profile_response.status_code in [200, 404, 400]
-
-            # Test creating and getting a todo still works
-            create_response = client.post(
-                f"/api/users/{sample_user_id}/todos",
-                json={"title": "Agent integration test", "completed": False},
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        # Test basic routes that existed before agent integration
+        root_response = client.get("/")
+        assert root_response.status_code == 200
+
+        health_response = client.get("/health")
+        assert health_response.status_code == 200
+
+        # Test creating and getting a todo still works
+        create_response = client.post(
+            "/api/tasks",
+            json={"title": "Agent integration test", "completed": False},
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            assert create_response.status_code == 200
-            created_data = create_response.json()
-            todo_id = created_data["id"]
+        assert create_response.status_code == 201
+        todo_id = create_response.json()["id"]
 
-            get_response = client.get(
-                f"/api/users/{sample_user_id}/todos/{todo_id}",
-                headers={"Authorization": "Bearer fake-token"}
-            )
-
-            assert get_response.status_code == 200
-            get_data = get_response.json()
-            assert get_data["id"] == todo_id
+        get_response = client.get(
+            f"/api/tasks/{todo_id}",
+            headers={"Authorization": "Bearer fake-token"}
+        )
 
-            # Clean up
-            client.delete(
-                f"/api/users/{sample_user_id}/todos/{todo_id}",
-                headers={"Authorization": "Bearer fake-token"}
-            )
+        assert get_response.status_code == 200
+        assert get_response.json()["id"] == todo_id
 
     def test_concurrent_access_still_safe(self, client, sample_user_id):
         """Test that concurrent access to todo functionality is still safe after agent integration."""
@@ -318,15 +308,12 @@ class TestPhaseIIIntegrity:
         results = []
 
         def create_todo(title):
-            with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-                mock_auth.return_value = sample_user_id
-
-                response = client.post(
-                    f"/api/users/{sample_user_id}/todos",
-                    json={"title": title, "completed": False},
-                    headers={"Authorization": "Bearer fake-token"}
-                )
-                results.append((title, response.status_code, response.json() if response.status_code == 200 else None))
+            response = client.post(
+                "/api/tasks",
+                json={"title": title, "completed": False},
+                headers={"Authorization": "Bearer fake-token"}
+            )
+            results.append((title, response.status_code))
 
         # Create multiple threads trying to create todos simultaneously
         threads = []
@@ -341,26 +328,9 @@ class TestPhaseIIIntegrity:
             thread.join()
 
         # Verify that all operations succeeded
-        for title, status_code, data in results:
-            assert status_code == 200, f"Thread operation for {title} failed with status {status_code}"
-
-        # Clean up created todos
-        with patch('backend.auth.jwt.get_current_user_id') as mock_auth:
-            mock_auth.return_value = sample_user_id
-
-            all_todos = client.get(
-                f"/api/users/{sample_user_id}/todos",
-                params={"limit": 10, "offset": 0},
-                headers={"Authorization": "Bearer fake-token"}
-            ).json()
-
-            for todo in all_todos:
-                if "Concurrent task" in todo.get("title", ""):
-                    client.delete(
-                        f"/api/users/{sample_user_id}/todos/{todo['id']}",
-                        headers={"Authorization": "Bearer fake-token"}
-                    )
+        for title, status_code in results:
+            assert status_code == 201, f"Thread operation for {title} failed with status {status_code}"
 
 
 if __name__ == "__main__":
-    pytest.main([__file__])
\ No newline at end of file
+    pytest.main([__file__])